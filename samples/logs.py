@@ -1,15 +1,24 @@
-from collections import defaultdict
 from json import loads
 from pprint import pprint
 
-import numpy as np
+from xmode.aggregation import GroupedSummaries
 
 keyword = 'EVENT: '
-collections = defaultdict(list)
+
+
+def _get_worker_count(data):
+    return data['workers']
+
+
+def _get_elapsed_time(data):
+    return data['elapsed_time']
+
+
+collections = GroupedSummaries(key=_get_worker_count, value=_get_elapsed_time)
 
 def aggregate(event):
-    # data has "message", "timestamp" and "ingestionTime"
-    message = event["message"].strip()
+    # event has "message", "timestamp" and "ingestionTime"
+    message = event.message.strip()
 
     if keyword not in message:
         return
@@ -19,17 +28,27 @@ def aggregate(event):
     if data['action'] != 'overall':
         return
 
-    collections[data['workers']].append(data)
+    collections.add(data)
+
+
+def export():
+    # With --processes, return the state of the worker (shard.done:samples.logs.export) ...
+    return collections
+
+
+def merge(states):
+    # ... and combine the states of all workers in the main process (shard.merge:samples.logs.merge).
+    for state in states:
+        collections.merge(state)
 
 
 def summarize():
+    # Can also be called while following (e.g., on poll.done) for an intermediate summary.
     packages = []
-    for worker_count, datasets in collections.items():
+    for worker_count, summary in collections.to_dict().items():
         package = dict(
             worker_count=worker_count,
-            length=len(datasets),
-            stat=_get_stat([dataset['elapsed_time'] for dataset in datasets])
-            # raw=datasets,
+            **summary
         )
         packages.append(package)
 
@@ -42,12 +61,3 @@ def summarize():
     for p in packages:
         s = p['stat']
         print(f'| {p.get("worker_count"):>10d} | {p.get("length"):>11d} | {s.get("min"):>8.4f} | {s.get("max"):>8.4f} | {s.get("mean"):>8.4f} | {s.get("median"):>8.4f} | {s.get("std"):>8.4f} | ')
-
-def _get_stat(series):
-    return dict(
-        min=np.amin(series),
-        max=np.amax(series),
-        mean=np.mean(series),
-        median=np.median(series),
-        std=np.std(series),
-    )
\ No newline at end of file
@@ -17,6 +17,7 @@ setup(name='xmode',
       author_email='jnopporn@shiroyuki.com',
       url='https://github.com/shiroyuki/xmode',
       packages=['xmode',
+                'xmode.cli',
                 'xmode.db',
                 'xmode.providers',
                 'xmode.utils'],
@@ -0,0 +1,270 @@
+from math import sqrt
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+
+class RunningStatistics(object):
+    """
+    Constant-memory count, min, max, mean and (population) standard deviation, with Welford's algorithm
+    """
+    __slots__ = ('count', 'min', 'max', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return sqrt(self.variance)
+
+    def add(self, value:float):
+        self.count += 1
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other:'RunningStatistics'):
+        """
+        Combine the statistics of another series (e.g., from another worker) into this one.
+        """
+        if not other.count:
+            return
+
+        if not self.count:
+            self.count, self.min, self.max, self.mean, self._m2 = other.count, other.min, other.max, other.mean, other._m2
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class P2Quantile(object):
+    """
+    Constant-memory estimate of a quantile with the P² algorithm (Jain and Chlamtac, 1985)
+
+    The estimate is exact until there are more than five values.
+    """
+    __slots__ = ('quantile', 'count', '_heights', '_positions', '_desired', '_increments')
+
+    def __init__(self, quantile:float=0.5):
+        self.quantile = quantile
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self._increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    @property
+    def value(self) -> Optional[float]:
+        heights = self._heights
+
+        if not heights:
+            return None
+
+        if self.count <= 5:
+            return _exact_quantile(sorted(heights), self.quantile)
+
+        return heights[2]
+
+    def add(self, value:float):
+        heights = self._heights
+        self.count += 1
+
+        if len(heights) < 5:
+            heights.append(value)
+
+            if len(heights) == 5:
+                heights.sort()
+
+            return
+
+        positions = self._positions
+        desired = self._desired
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for index in range(cell + 1, 5):
+            positions[index] += 1
+
+        for index in range(5):
+            desired[index] += self._increments[index]
+
+        for index in (1, 2, 3):
+            offset = desired[index] - positions[index]
+
+            if (offset >= 1 and positions[index + 1] - positions[index] > 1) \
+                    or (offset <= -1 and positions[index - 1] - positions[index] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(index, step)
+
+                if not heights[index - 1] < height < heights[index + 1]:
+                    height = self._linear(index, step)
+
+                heights[index] = height
+                positions[index] += step
+
+    def merge(self, other:'P2Quantile'):
+        """
+        Combine the estimate of another series into this one.
+
+        The markers of both estimates are averaged by their number of values, so the result is an
+        approximation of the quantile of the combined series, unless either series has five values or less.
+        """
+        if other.count <= 5:
+            for value in other._heights:
+                self.add(value)
+
+            return
+
+        if self.count <= 5:
+            values = list(self._heights)
+
+            self.count = other.count
+            self._heights = list(other._heights)
+            self._positions = list(other._positions)
+            self._desired = list(other._desired)
+
+            for value in values:
+                self.add(value)
+
+            return
+
+        count = self.count + other.count
+
+        self._heights = [(mine * self.count + theirs * other.count) / count
+                         for mine, theirs in zip(self._heights, other._heights)]
+        self._heights[0] = min(self._heights[0], other._heights[0])
+        self._heights[4] = max(self._heights[4], other._heights[4])
+        self._positions = [mine + theirs for mine, theirs in zip(self._positions, other._positions)]
+        self._positions[0] = 1
+        self._desired = [1 + (count - 1) * increment for increment in self._increments]
+        self.count = count
+
+    def _parabolic(self, index:int, step:int) -> float:
+        heights = self._heights
+        positions = self._positions
+
+        return heights[index] + step / (positions[index + 1] - positions[index - 1]) * (
+            (positions[index] - positions[index - 1] + step)
+            * (heights[index + 1] - heights[index]) / (positions[index + 1] - positions[index])
+            + (positions[index + 1] - positions[index] - step)
+            * (heights[index] - heights[index - 1]) / (positions[index] - positions[index - 1])
+        )
+
+    def _linear(self, index:int, step:int) -> float:
+        heights = self._heights
+        positions = self._positions
+
+        return heights[index] + step * (heights[index + step] - heights[index]) / (positions[index + step] - positions[index])
+
+
+class SeriesSummary(object):
+    """
+    Streaming summary of a series of numbers: min, max, mean, median (estimated) and standard deviation
+    """
+    __slots__ = ('statistics', 'median')
+
+    def __init__(self):
+        self.statistics = RunningStatistics()
+        self.median = P2Quantile(0.5)
+
+    @property
+    def count(self) -> int:
+        return self.statistics.count
+
+    def add(self, value:float):
+        self.statistics.add(value)
+        self.median.add(value)
+
+    def merge(self, other:'SeriesSummary'):
+        self.statistics.merge(other.statistics)
+        self.median.merge(other.median)
+
+    def to_dict(self) -> dict:
+        statistics = self.statistics
+
+        return dict(min=statistics.min,
+                    max=statistics.max,
+                    mean=statistics.mean,
+                    median=self.median.value,
+                    std=statistics.std)
+
+
+class GroupedSummaries(object):
+    """
+    Streaming summaries of a series of numbers per group
+
+    ``key`` gives the group of an item and ``value`` the number to add to the summary of that group.
+    """
+    def __init__(self, key:Callable, value:Callable, summary_class:Callable=SeriesSummary):
+        self.key = key
+        self.value = value
+        self.summary_class = summary_class
+        self.groups = dict()  # type: Dict[Hashable, SeriesSummary]
+
+    def add(self, item):
+        key = self.key(item)
+        summary = self.groups.get(key)
+
+        if summary is None:
+            summary = self.groups[key] = self.summary_class()
+
+        summary.add(self.value(item))
+
+    def add_all(self, items:Iterable):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other:'GroupedSummaries'):
+        """
+        Combine the summaries of another instance (e.g., the state of another worker process) into this one.
+        """
+        for key, summary in other.groups.items():
+            if key in self.groups:
+                self.groups[key].merge(summary)
+            else:
+                self.groups[key] = summary
+
+    def to_dict(self) -> Dict[Hashable, dict]:
+        return {
+            key: dict(length=summary.count, stat=summary.to_dict())
+            for key, summary in self.groups.items()
+        }
+
+
+def _exact_quantile(values:list, quantile:float) -> float:
+    # Same as numpy.quantile/numpy.median with the linear interpolation.
+    position = (len(values) - 1) * quantile
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
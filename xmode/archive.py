@@ -0,0 +1,179 @@
+import gzip
+import json
+from logging import getLogger
+import os
+from queue import Empty, Queue
+from threading import Thread
+from time import gmtime, strftime, time
+from typing import List, Optional
+
+from xmode.event import EventDrivenObject
+from xmode.sinks import to_dict
+
+_logger = getLogger(__name__)
+
+segment_suffix = '.jsonl.gz'
+index_suffix = '.index.json'
+
+
+class ArchiveSink(object):
+    """
+    Rolling archive of the tailed events in a local directory
+
+    The events go into gzip-compressed JSON-lines segments, which are rotated once they hold ``max_bytes``
+    of uncompressed data or are older than ``max_age`` seconds. Every finished segment comes with a sidecar
+    index (``<segment name>.index.json``) telling its minimum and maximum timestamps, its stream names and
+    its number of events. The segment being written has a ``.partial`` suffix.
+
+    Encoding, compression and syncing to disk happen on a background thread. The tail only waits when more
+    than ``capacity`` batches are pending.
+    """
+    def __init__(self, directory:str, max_bytes:int=64 * 1024 * 1024, max_age:float=3600,
+                 compression_level:int=6, capacity:int=1000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression_level = compression_level
+        self._queue = Queue(capacity)
+        self._thread = None
+        self._segment = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def attach(self, source:EventDrivenObject):
+        source.on('events.batch', self.write_batch)
+        source.on('done', self.close)
+
+        self.start()
+
+    def start(self):
+        if self._thread:
+            return
+
+        self._thread = Thread(target=self._run, name='xmode-archive', daemon=True)
+        self._thread.start()
+
+    def write_batch(self, events:List):
+        self._queue.put(events)
+
+    def close(self):
+        """
+        Write every pending batch, finish the current segment and stop the writer thread.
+        """
+        if not self._thread:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                events = self._queue.get(timeout=1)
+            except Empty:
+                events = []
+
+            if events is None:
+                break
+
+            try:
+                self._write(events)
+            except Exception:
+                _logger.exception(f'{self.directory}: Failed to archive {len(events)} event(s)')
+
+        if self._segment:
+            self._segment.finish()
+            self._segment = None
+
+    def _write(self, events:List):
+        segment = self._segment
+
+        if segment and (segment.size >= self.max_bytes or time() - segment.opened_at >= self.max_age):
+            segment.finish()
+            segment = self._segment = None
+
+        if not events:
+            return
+
+        if not segment:
+            segment = self._segment = _Segment(self.directory, self.compression_level)
+
+        segment.write(events)
+
+
+class _Segment(object):
+    _sequence = 0
+
+    def __init__(self, directory:str, compression_level:int):
+        _Segment._sequence += 1
+
+        self.opened_at = time()
+        name = f'events-{strftime("%Y%m%dT%H%M%S", gmtime(self.opened_at))}-{os.getpid()}-{_Segment._sequence:04d}'
+        self.path = os.path.join(directory, name + segment_suffix)
+        self.size = 0
+        self.count = 0
+        self.min_timestamp = None
+        self.max_timestamp = None
+        self.streams = set()
+        self.log_groups = set()
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        self._file = gzip.open(self.path + '.partial', 'wb', compresslevel=compression_level)
+
+    def write(self, events:List):
+        encode = self._encode
+        data = ''.join([encode(to_dict(event)) + '\n' for event in events]).encode('utf-8')
+
+        self._file.write(data)
+
+        timestamps = [event.timestamp for event in events]
+        lowest = min(timestamps)
+        highest = max(timestamps)
+
+        self.size += len(data)
+        self.count += len(events)
+        self.min_timestamp = lowest if self.min_timestamp is None else min(self.min_timestamp, lowest)
+        self.max_timestamp = highest if self.max_timestamp is None else max(self.max_timestamp, highest)
+        self.streams.update(event.stream for event in events)
+        self.log_groups.update(event.log_group for event in events if event.log_group)
+
+    def finish(self):
+        self._file.close()
+
+        with open(self.path + '.partial', 'rb') as f:
+            os.fsync(f.fileno())
+
+        os.replace(self.path + '.partial', self.path)
+
+        write_index(self.path, dict(segment=os.path.basename(self.path),
+                                    min_timestamp=self.min_timestamp,
+                                    max_timestamp=self.max_timestamp,
+                                    count=self.count,
+                                    streams=sorted(self.streams),
+                                    log_groups=sorted(self.log_groups)))
+
+
+def index_path(segment_path:str) -> str:
+    if segment_path.endswith(segment_suffix):
+        segment_path = segment_path[:-len(segment_suffix)]
+
+    return segment_path + index_suffix
+
+
+def read_index(segment_path:str) -> Optional[dict]:
+    path = index_path(segment_path)
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_index(segment_path:str, index:dict):
+    path = index_path(segment_path)
+
+    with open(path + '.partial', 'w') as f:
+        json.dump(index, f)
+
+    os.replace(path + '.partial', path)
@@ -0,0 +1,60 @@
+import json
+import os
+from time import time
+from typing import Optional
+
+
+class CheckpointFile(object):
+    """
+    Progress of the tails, saved to a JSON file
+
+    Each tail keeps its state under its own key (e.g., the name of the log group). The updates are kept in
+    memory and written at most once every ``interval`` seconds, unless forced, by replacing the file
+    atomically so that a crash never leaves a half-written checkpoint behind.
+    """
+    version = 1
+
+    def __init__(self, path:str, interval:float=5.0):
+        self.path = path
+        self.interval = interval
+        self._data = self._load()
+        self._saved_at = time()
+        self._dirty = False
+
+    def get(self, key:str) -> Optional[dict]:
+        return self._data['tails'].get(key)
+
+    def update(self, key:str, state:dict):
+        self._data['tails'][key] = state
+        self._dirty = True
+
+    def save(self, force:bool=False):
+        if not self._dirty:
+            return
+
+        if not force and time() - self._saved_at < self.interval:
+            return
+
+        temp_path = f'{self.path}.tmp'
+
+        with open(temp_path, 'w') as f:
+            json.dump(self._data, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.path)
+
+        self._saved_at = time()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return dict(version=self.version, tails=dict())
+
+        with open(self.path) as f:
+            data = json.load(f)
+
+        if data.get('version') != self.version:
+            raise ValueError(f'{self.path}: Unsupported checkpoint version ({data.get("version")})')
+
+        return data
@@ -2,11 +2,15 @@
 Log Tracer
 """
 from argparse import ArgumentParser, Namespace
-from importlib import import_module
 
 from gallium.interface import ICommand
 
-from xmode.providers.aws import SessionFactory, CloudWatchLogs, event_to_stdout
+from xmode.checkpoint import CheckpointFile
+from xmode.cli.handlers import (bind_handlers, define_filter_arguments, define_handler_arguments, make_event_filter,
+                                 make_metrics)
+from xmode.providers.aws import SessionFactory, CloudWatchLogs, MultiCloudWatchLogs
+from xmode.utils.polling import PollScheduler
+from xmode.utils.timestamps import parse_timestamp
 
 
 class TailCloudWatchLog(ICommand):
@@ -17,10 +21,6 @@ class TailCloudWatchLog(ICommand):
         return 'aws:logs:tail'
 
     def define(self, parser:ArgumentParser):
-        parser.add_argument('--verbose', '-v',
-                            action='store_true',
-                            required=False,
-                            help='Show log as it tails')
         parser.add_argument('--follow', '-f',
                             action='store_true',
                             required=False,
@@ -37,26 +37,81 @@ class TailCloudWatchLog(ICommand):
                             type=int,
                             default=2,
                             help='User profile (used with assumed roles)')
+        parser.add_argument('--workers', '-w',
+                            required=False,
+                            type=int,
+                            default=1,
+                            help='Number of streams to fetch concurrently')
+        parser.add_argument('--filter-pattern', '-F',
+                            required=False,
+                            help='CloudWatch filter pattern to search the whole log group with (ignores --max-streams)')
+        parser.add_argument('--stream-prefix',
+                            required=False,
+                            help='Only search the log streams whose names start with this prefix (ignores --max-streams)')
+        parser.add_argument('--since',
+                            required=False,
+                            help='Start from this time instead of 15 minutes ago (e.g., 1600000000000, 2h or 2020-09-13T12:00:00)')
+        parser.add_argument('--until',
+                            required=False,
+                            help='Only tail the events until this time (same format as --since)')
+        parser.add_argument('--poll-min',
+                            required=False,
+                            type=float,
+                            default=0.5,
+                            help='Minimum number of seconds between the polls while following')
+        parser.add_argument('--poll-max',
+                            required=False,
+                            type=float,
+                            default=30,
+                            help='Maximum number of seconds between the polls while following idle logs')
+        parser.add_argument('--api-budget',
+                            required=False,
+                            type=float,
+                            help='Maximum average number of API calls per second while following')
+        parser.add_argument('--checkpoint',
+                            required=False,
+                            help='JSON file to resume from and to save the progress to')
+        parser.add_argument('--checkpoint-interval',
+                            required=False,
+                            type=float,
+                            default=5,
+                            help='Minimum number of seconds between checkpoint writes')
+        parser.add_argument('--log-group', '-g',
+                            action='append',
+                            default=[],
+                            dest='extra_log_groups',
+                            help='Additional log group to tail along with LOG_GROUP (repeatable)')
         parser.add_argument('log_group')
-        parser.add_argument('event',
-                            nargs='*',
-                            help='Event and Fully qualified path to callable handler (e.g., event:samples.logs.aggregate)')
+        define_filter_arguments(parser)
+        define_handler_arguments(parser)
 
     def execute(self, args:Namespace):
         session = SessionFactory.new(args.aws_region, args.aws_profile)
-        cwl = CloudWatchLogs(session, args.log_group)
-
-        if args.event:
-            for event_to_handler_path in args.event:
-                event, handler_path = event_to_handler_path.split(':')
-                blocks = handler_path.split('.')
+        checkpoint = CheckpointFile(args.checkpoint, args.checkpoint_interval) if args.checkpoint else None
+        event_filter = make_event_filter(args,
+                                         since=parse_timestamp(args.since) if args.since else None,
+                                         until=parse_timestamp(args.until) if args.until else None)
 
-                cwl.on(event,
-                       getattr(import_module('.'.join(blocks[:-1])), blocks[-1]))
+        if args.extra_log_groups:
+            cwl = MultiCloudWatchLogs(session,
+                                      [args.log_group, *args.extra_log_groups],
+                                      max_workers=args.workers,
+                                      checkpoint=checkpoint,
+                                      event_filter=event_filter,
+                                      metrics=make_metrics(args))
+        else:
+            cwl = CloudWatchLogs(session,
+                                 args.log_group,
+                                 max_workers=args.workers,
+                                 checkpoint=checkpoint,
+                                 event_filter=event_filter,
+                                 metrics=make_metrics(args))
 
-        if args.verbose:
-            print('No event handlers provided. All events go to STDOUT.')
-            cwl.on('event', event_to_stdout)
+        bind_handlers(cwl, args)
 
-        cwl.tail(max_streams=args.max_streams, follow=args.follow)
+        cwl.tail(max_streams=args.max_streams,
+                 follow=args.follow,
+                 filter_pattern=args.filter_pattern,
+                 stream_prefix=args.stream_prefix,
+                 scheduler=PollScheduler(args.poll_min, args.poll_max, args.api_budget))
 
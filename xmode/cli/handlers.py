@@ -0,0 +1,248 @@
+"""
+Event handlers shared by the commands which emit events
+"""
+from argparse import ArgumentParser, Namespace
+import sys
+from typing import Optional
+
+from xmode.archive import ArchiveSink
+from xmode.dispatch import QueuedDispatcher
+from xmode.event import EventDrivenObject
+from xmode.filters import EventFilter
+from xmode.metrics import Metrics, MetricsReporter
+from xmode.prometheus import MetricsServer, TextfileExporter
+from xmode.providers.aws import event_to_stdout
+from xmode.providers.aws_lambda import InvocationTracker, invocation_to_stdout
+from xmode.sharding import ShardedProcessDispatcher
+from xmode.sinks import sink_classes
+from xmode.utils.importer import import_callable
+from xmode.windowing import WindowedAggregator, accumulator_classes, window_to_stdout
+
+
+def define_filter_arguments(parser:ArgumentParser):
+    """
+    Define the options to filter the events before they reach the handlers.
+    """
+    parser.add_argument('--level',
+                        action='append',
+                        default=[],
+                        dest='levels',
+                        help='Only keep the Lambda log lines of this level (repeatable or comma-separated, e.g., ERROR,WARN)')
+    parser.add_argument('--grep',
+                        required=False,
+                        help='Only keep the events whose message matches this regular expression')
+    parser.add_argument('--exclude',
+                        required=False,
+                        help='Drop the events whose message matches this regular expression')
+
+
+def make_event_filter(args:Namespace, **criteria) -> Optional[EventFilter]:
+    """
+    Make the filter from the options (see ``define_filter_arguments``) and the other criteria, if any is given.
+    """
+    levels = [level for value in args.levels for level in value.split(',') if level]
+
+    if not (levels or args.grep or args.exclude or any(value is not None for value in criteria.values())):
+        return None
+
+    return EventFilter(levels=levels, grep=args.grep, exclude=args.exclude, **criteria)
+
+
+def make_metrics(args:Namespace) -> Optional[Metrics]:
+    """
+    Make the metrics if any option needs them (see ``define_handler_arguments``).
+    """
+    if args.stats or args.stats_interval or args.metrics_port or args.metrics_textfile:
+        return Metrics()
+
+    return None
+
+
+def define_handler_arguments(parser:ArgumentParser):
+    """
+    Define the options for the handlers and, last, the ``event`` positional argument.
+    """
+    parser.add_argument('--verbose', '-v',
+                        action='store_true',
+                        required=False,
+                        help='Show log as it tails')
+    parser.add_argument('--output', '-o',
+                        required=False,
+                        choices=sorted(sink_classes),
+                        help='Print the events to STDOUT as text or JSON lines (faster than --verbose)')
+    parser.add_argument('--archive',
+                        required=False,
+                        help='Directory to keep the events in, as rotated gzip-compressed JSON-lines segments')
+    parser.add_argument('--archive-segment-size',
+                        required=False,
+                        type=int,
+                        default=64,
+                        help='Uncompressed size (in MB) of an archive segment before it is rotated')
+    parser.add_argument('--archive-segment-age',
+                        required=False,
+                        type=float,
+                        default=3600,
+                        help='Age (in seconds) of an archive segment before it is rotated')
+    handler_mode = parser.add_mutually_exclusive_group()
+    handler_mode.add_argument('--handler-workers',
+                              required=False,
+                              type=int,
+                              default=0,
+                              help='Number of threads to run the event handlers on (0 to run them while tailing)')
+    handler_mode.add_argument('--processes',
+                              required=False,
+                              type=int,
+                              default=0,
+                              help='Number of processes to shard the events across (see --shard-by)')
+    parser.add_argument('--shard-by',
+                        required=False,
+                        choices=ShardedProcessDispatcher.shard_keys,
+                        default='stream',
+                        help='Event attribute deciding which process handles the event (with --processes)')
+    parser.add_argument('--queue-size',
+                        required=False,
+                        type=int,
+                        default=10000,
+                        help='Number of events waiting for the handler workers before overflowing')
+    parser.add_argument('--overflow',
+                        required=False,
+                        choices=QueuedDispatcher.overflow_policies,
+                        default='block',
+                        help='What to do with the events when the queue of the handler workers is full')
+    parser.add_argument('--window',
+                        required=False,
+                        type=float,
+                        help='Aggregate the events in windows of this many seconds (see window.closed)')
+    parser.add_argument('--window-slide',
+                        required=False,
+                        type=float,
+                        help='Seconds between the starts of the windows, for sliding windows (default: --window)')
+    parser.add_argument('--window-lateness',
+                        required=False,
+                        type=float,
+                        default=0,
+                        help='Seconds to keep a window open for late events after its end')
+    parser.add_argument('--window-accumulator',
+                        action='append',
+                        default=[],
+                        dest='window_accumulators',
+                        help=f'Accumulator to run on every window: {", ".join(sorted(accumulator_classes))} '
+                             f'or the fully qualified path to a class (repeatable, default: levels)')
+    parser.add_argument('--invocations',
+                        action='store_true',
+                        required=False,
+                        help='Put together the Lambda invocations from their log lines (see invocation.completed)')
+    parser.add_argument('--invocation-ttl',
+                        required=False,
+                        type=float,
+                        default=900,
+                        help='Seconds (of event time) before an unfinished Lambda invocation is evicted')
+    parser.add_argument('--invocation-capacity',
+                        required=False,
+                        type=int,
+                        default=10000,
+                        help='Maximum number of Lambda invocations in flight before the oldest one is evicted')
+    parser.add_argument('--stats',
+                        action='store_true',
+                        required=False,
+                        help='Measure the tail and the handlers, and print a summary to STDERR at the end')
+    parser.add_argument('--stats-interval',
+                        required=False,
+                        type=float,
+                        help='Also print the summary every this many seconds (implies --stats)')
+    parser.add_argument('--metrics-port',
+                        required=False,
+                        type=int,
+                        help='Serve the statistics in the Prometheus text format on this port (at /metrics)')
+    parser.add_argument('--metrics-textfile',
+                        required=False,
+                        help='Write the statistics in the Prometheus text format to this file (e.g., for the node exporter)')
+    parser.add_argument('event',
+                        nargs='*',
+                        help='Event and Fully qualified path to callable handler (e.g., event:samples.logs.aggregate)')
+
+
+def bind_handlers(source:EventDrivenObject, args:Namespace):
+    """
+    Register the handlers, the sinks and the handler workers (if any) on the source.
+    """
+    bus = source
+
+    if args.processes > 0:
+        bus = ShardedProcessDispatcher(args.processes, args.shard_by)
+    elif args.handler_workers > 0:
+        bus = QueuedDispatcher(args.handler_workers, args.queue_size, args.overflow)
+
+    bus.metrics = source.metrics
+
+    handler_paths = []
+
+    if args.event:
+        for event_to_handler_path in args.event:
+            handler_paths.append(tuple(event_to_handler_path.split(':')))
+
+    if args.verbose:
+        print('No event handlers provided. All events go to STDOUT.')
+        handler_paths.append(('event', f'{event_to_stdout.__module__}.{event_to_stdout.__name__}'))
+
+    handled_events = [event for event, _ in handler_paths]
+
+    if args.window and 'window.closed' not in handled_events:
+        handler_paths.append(('window.closed', f'{window_to_stdout.__module__}.{window_to_stdout.__name__}'))
+
+    if args.invocations and 'invocation.completed' not in handled_events:
+        handler_paths.append(('invocation.completed',
+                              f'{invocation_to_stdout.__module__}.{invocation_to_stdout.__name__}'))
+
+    for event, handler_path in handler_paths:
+        if isinstance(bus, ShardedProcessDispatcher):
+            bus.register(event, handler_path)
+        else:
+            bus.on(event, import_callable(handler_path))
+
+    if args.window:
+        accumulators = {
+            name: accumulator_classes.get(name) or import_callable(name)
+            for name in args.window_accumulators or ['levels']
+        }
+
+        # Before the handler workers, so that the last windows are closed before the workers stop.
+        WindowedAggregator(args.window,
+                           slide=args.window_slide,
+                           allowed_lateness=args.window_lateness,
+                           accumulators=accumulators).attach(source)
+
+    if args.invocations:
+        InvocationTracker(capacity=args.invocation_capacity, ttl=args.invocation_ttl).attach(source)
+
+    if bus is not source:
+        bus.attach(source)
+
+    if isinstance(bus, QueuedDispatcher) and getattr(source, 'checkpoint', None):
+        # The checkpoint is committed once the poll is done: the queued events must have been handled by then.
+        source.on('poll.done', bus.drain)
+
+    if args.output:
+        sink_classes[args.output]().attach(source)
+
+    if args.archive:
+        ArchiveSink(args.archive,
+                    max_bytes=args.archive_segment_size * 1024 * 1024,
+                    max_age=args.archive_segment_age).attach(source)
+
+    if source.metrics is None:
+        return
+
+    if args.metrics_port:
+        MetricsServer(source.metrics, args.metrics_port).attach(source)
+
+    # Last, so that the final metrics on done cover everything else.
+    if args.metrics_textfile:
+        TextfileExporter(source.metrics, args.metrics_textfile).attach(source)
+
+    if args.stats or args.stats_interval:
+        MetricsReporter(source.metrics, args.stats_interval, write=_print_to_stderr).attach(source)
+
+
+def _print_to_stderr(text:str):
+    print(text, file=sys.stderr, flush=True)
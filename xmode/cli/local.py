@@ -0,0 +1,48 @@
+"""
+Log Replay
+"""
+from argparse import ArgumentParser, Namespace
+
+from gallium.interface import ICommand
+
+from xmode.cli.handlers import (bind_handlers, define_filter_arguments, define_handler_arguments, make_event_filter,
+                                 make_metrics)
+from xmode.providers.local import LocalLogs
+from xmode.utils.timestamps import parse_timestamp
+
+
+class ReplayLocalLog(ICommand):
+    """
+    Replay archived logs through the event handlers
+    """
+    def identifier(self):
+        return 'local:logs:replay'
+
+    def define(self, parser:ArgumentParser):
+        parser.add_argument('--since',
+                            required=False,
+                            help='Only replay the events since this time (e.g., 1600000000000, 2h or 2020-09-13T12:00:00)')
+        parser.add_argument('--until',
+                            required=False,
+                            help='Only replay the events until this time (same format as --since)')
+        parser.add_argument('--stream-prefix',
+                            required=False,
+                            help='Only replay the events of the log streams whose names start with this prefix')
+        parser.add_argument('--path', '-i',
+                            action='append',
+                            default=[],
+                            dest='extra_paths',
+                            help='Additional file or directory to replay along with PATH (repeatable)')
+        parser.add_argument('path',
+                            help='JSON-lines file (plain or gzip-compressed) or directory of them (e.g., from --archive)')
+        define_filter_arguments(parser)
+        define_handler_arguments(parser)
+
+    def execute(self, args:Namespace):
+        logs = LocalLogs(args.path, *args.extra_paths, event_filter=make_event_filter(args, stream_prefix=args.stream_prefix))
+        logs.metrics = make_metrics(args)
+
+        bind_handlers(logs, args)
+
+        logs.replay(since=parse_timestamp(args.since) if args.since else None,
+                    until=parse_timestamp(args.until) if args.until else None)
@@ -0,0 +1,59 @@
+from collections import deque
+
+
+class EventDeduplicator(object):
+    """
+    Bounded set of recently seen events
+
+    The events are looked up by their hash. Anything older than the watermark, which trails the newest
+    timestamp by ``window`` milliseconds, is forgotten so that the memory usage only depends on how many
+    events fit in the window, not on how long the tail has been running.
+    """
+    def __init__(self, window:int):
+        self.window = window
+        self.newest_timestamp = None
+        self._seen = set()
+        self._order = deque()
+
+    @property
+    def watermark(self):
+        if self.newest_timestamp is None:
+            return None
+
+        return self.newest_timestamp - self.window
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, event):
+        return event in self._seen
+
+    def add(self, event) -> bool:
+        """
+        Remember the event and tell whether it has not been seen before.
+
+        Late events, older than the watermark, are let through without being remembered.
+        """
+        if event in self._seen:
+            return False
+
+        timestamp = event.timestamp
+
+        if self.newest_timestamp is None or timestamp > self.newest_timestamp:
+            self.newest_timestamp = timestamp
+            self._evict()
+        elif timestamp < self.newest_timestamp - self.window:
+            return True
+
+        self._seen.add(event)
+        self._order.append(event)
+
+        return True
+
+    def _evict(self):
+        watermark = self.newest_timestamp - self.window
+        order = self._order
+        seen = self._seen
+
+        while order and order[0].timestamp < watermark:
+            seen.discard(order.popleft())
@@ -0,0 +1,212 @@
+from collections import deque
+from functools import partial
+from logging import getLogger
+import pickle
+from tempfile import TemporaryFile
+from threading import Condition, Thread
+from time import time
+
+from xmode.event import EventDrivenObject
+
+_logger = getLogger(__name__)
+
+
+class QueuedDispatcher(EventDrivenObject):
+    """
+    Event bus which runs its handlers on worker threads, off the thread that triggers the events
+
+    The triggers wait in a queue of up to ``capacity`` items. When the queue is full, the ``overflow``
+    policy decides what to do with the next trigger:
+
+    - ``block``: wait until a worker makes room, which slows down the producer (the default).
+    - ``drop-oldest``: drop the oldest trigger in the queue.
+    - ``spill``: write the triggers to a temporary file until the workers catch up.
+
+    With more than one worker, the handlers may be called out of order and concurrently. With ``metrics``,
+    the depth of the queue, the lag and the dropped triggers are published as ``dispatch_queue_depth``,
+    ``dispatch_lag_seconds`` and ``dispatch_dropped``.
+    """
+    overflow_policies = ('block', 'drop-oldest', 'spill')
+
+    def __init__(self, workers:int=1, capacity:int=10000, overflow:str='block'):
+        super().__init__()
+
+        if overflow not in self.overflow_policies:
+            raise ValueError(f'Unknown overflow policy: {overflow} (expected one of {", ".join(self.overflow_policies)})')
+
+        self.workers = max(1, workers)
+        self.capacity = max(1, capacity)
+        self.overflow = overflow
+        self.dropped = 0  # number of triggers dropped because of the overflow
+        self.lag = 0.0  # seconds the last handled trigger had been waiting in the queue
+        self._queue = deque()
+        self._spill = None
+        self._condition = Condition()
+        self._threads = []
+        self._busy = 0  # workers running the handlers of a trigger
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of triggers waiting to be handled, including the spilled ones
+        """
+        return len(self._queue) + (len(self._spill) if self._spill else 0)
+
+    def attach(self, source:EventDrivenObject, *event_names:str):
+        """
+        Relay the events of the source into the queue, by default every event with a handler on this bus.
+
+        When the source is done, the queue is drained before ``done`` is triggered on this bus.
+        """
+        for event_name in event_names or list(self._events):
+            if event_name == 'done':
+                continue
+
+            source.on(event_name, partial(self.submit, event_name))
+
+        source.on('done', self.close)
+
+        self.start()
+
+    def start(self):
+        if self._threads:
+            return
+
+        for index in range(self.workers):
+            thread = Thread(target=self._work, name=f'xmode-dispatcher-{index}', daemon=True)
+            thread.start()
+
+            self._threads.append(thread)
+
+    def submit(self, event_name:str, *args, **kwargs):
+        item = (time(), event_name, args, kwargs)
+
+        with self._condition:
+            queue = self._queue
+
+            if self._spill:
+                self._spill.push(item)  # Keep the order until the spilled triggers are handled.
+            elif len(queue) < self.capacity:
+                queue.append(item)
+            elif self.overflow == 'block':
+                while len(queue) >= self.capacity:
+                    self._condition.wait()
+
+                queue.append(item)
+            elif self.overflow == 'drop-oldest':
+                queue.popleft()
+                queue.append(item)
+                self.dropped += 1
+
+                if self.metrics is not None:
+                    self.metrics.counter('dispatch_dropped').inc()
+            else:
+                self._spill = _SpillFile()
+                self._spill.push(item)
+
+            if self.metrics is not None:
+                self.metrics.gauge('dispatch_queue_depth').set(self.depth)
+
+            self._condition.notify_all()
+
+    def drain(self):
+        """
+        Wait until every trigger submitted so far has been handled, e.g., before committing a checkpoint.
+        """
+        with self._condition:
+            while self.depth or self._busy:
+                self._condition.wait()
+
+    def close(self):
+        """
+        Handle every queued trigger, stop the workers and trigger ``done``.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+
+        self._threads = []
+
+        self.trigger('done')
+
+    def _work(self):
+        condition = self._condition
+
+        while True:
+            with condition:
+                while not self.depth and not self._closed:
+                    condition.wait()
+
+                if not self.depth:
+                    return
+
+                item = self._take()
+                depth = self.depth
+                self._busy += 1
+                condition.notify_all()
+
+            enqueued_at, event_name, args, kwargs = item
+            self.lag = time() - enqueued_at
+
+            if self.metrics is not None:
+                self.metrics.gauge('dispatch_queue_depth').set(depth)
+                self.metrics.gauge('dispatch_lag_seconds').set(self.lag)
+
+            try:
+                self.trigger(event_name, *args, **kwargs)
+            except Exception:
+                _logger.exception(f'Failed to handle "{event_name}"')
+            finally:
+                with condition:
+                    self._busy -= 1
+                    condition.notify_all()
+
+    def _take(self):
+        queue = self._queue
+        spill = self._spill
+
+        if not queue and spill:
+            # Bring the spilled triggers back into memory.
+            while spill and len(queue) < self.capacity:
+                queue.append(spill.pop())
+
+            if not spill:
+                spill.close()
+                self._spill = None
+
+        return queue.popleft()
+
+
+class _SpillFile(object):
+    """
+    First-in-first-out queue of pickled items in a temporary file
+    """
+    def __init__(self):
+        self._file = TemporaryFile()
+        self._read_at = 0
+        self._write_at = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, item):
+        self._file.seek(self._write_at)
+        pickle.dump(item, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._write_at = self._file.tell()
+        self._count += 1
+
+    def pop(self):
+        self._file.seek(self._read_at)
+        item = pickle.load(self._file)
+        self._read_at = self._file.tell()
+        self._count -= 1
+
+        return item
+
+    def close(self):
+        self._file.close()
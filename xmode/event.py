@@ -1,13 +1,17 @@
 from collections import defaultdict
-from typing import Callable
+from inspect import isawaitable
+from time import perf_counter
+from typing import Callable, Iterable
 
 
 class EventDrivenObject(object):
+    metrics = None  # Metrics, to measure the time spent in each handler
+
     def __init__(self):
-        self._events = defaultdict(set)
+        self._events = defaultdict(dict)  # event name -> callbacks, in the order of registration
 
     def on(self, event_name:str, callback:Callable):
-        self._events[event_name].add(callback)
+        self._events[event_name][callback] = None
 
     def trigger(self, event_name:str, *args, **kwargs):
         callbacks = self._events.get(event_name)
@@ -15,7 +19,96 @@ class EventDrivenObject(object):
         if not callbacks:
             return
 
-        [
+        metrics = self.metrics
+
+        if metrics is None:
+            for callback in callbacks:
+                callback(*args, **kwargs)
+
+            return
+
+        for callback in callbacks:
+            started_at = perf_counter()
             callback(*args, **kwargs)
-            for callback in callbacks
-        ]
\ No newline at end of file
+            metrics.handler_histogram(event_name, callback).observe(perf_counter() - started_at)
+
+    def trigger_each(self, event_name:str, items:Iterable):
+        """
+        Trigger the event once per item, looking up the callbacks only once for the whole batch.
+        """
+        callbacks = self._events.get(event_name)
+
+        if not callbacks:
+            return
+
+        metrics = self.metrics
+
+        if metrics is not None:
+            self._trigger_each_measured(metrics, event_name, tuple(callbacks), items)
+
+            return
+
+        if len(callbacks) == 1:
+            callback = next(iter(callbacks))
+
+            for item in items:
+                callback(item)
+
+            return
+
+        callbacks = tuple(callbacks)
+
+        for item in items:
+            for callback in callbacks:
+                callback(item)
+
+    @staticmethod
+    def _trigger_each_measured(metrics, event_name:str, callbacks:tuple, items:Iterable):
+        """
+        Trigger the event once per item like ``trigger_each`` and record the average time per item of each handler.
+        """
+        items = items if isinstance(items, (list, tuple)) else list(items)
+
+        if not items:
+            return
+
+        elapsed = [0.0] * len(callbacks)
+
+        if len(callbacks) == 1:
+            callback = callbacks[0]
+            started_at = perf_counter()
+
+            for item in items:
+                callback(item)
+
+            elapsed[0] = perf_counter() - started_at
+        else:
+            for item in items:
+                for index, callback in enumerate(callbacks):
+                    started_at = perf_counter()
+                    callback(item)
+                    elapsed[index] += perf_counter() - started_at
+
+        for callback, total in zip(callbacks, elapsed):
+            metrics.handler_histogram(event_name, callback).observe(total / len(items), len(items))
+
+    async def atrigger(self, event_name:str, *args, **kwargs):
+        """
+        Trigger the event and await the callbacks which are coroutine functions.
+        """
+        callbacks = self._events.get(event_name)
+
+        if not callbacks:
+            return
+
+        metrics = self.metrics
+
+        for callback in list(callbacks):
+            started_at = perf_counter()
+            result = callback(*args, **kwargs)
+
+            if isawaitable(result):
+                await result
+
+            if metrics is not None:
+                metrics.handler_histogram(event_name, callback).observe(perf_counter() - started_at)
@@ -0,0 +1,95 @@
+from re import compile, escape
+from typing import Callable, Iterable, List, Optional
+
+
+class EventFilter(object):
+    """
+    Predicate on the raw log events (the dictionaries from the API or the archive), checked before any
+    ``Event`` is created or any handler is called
+
+    An event is kept when it has one of the Lambda log ``levels``, matches the ``grep`` pattern, does not
+    match the ``exclude`` pattern, comes from a stream whose name starts with ``stream_prefix`` and has its
+    timestamp between ``since`` and ``until`` (in milliseconds, inclusive). The cheapest checks go first.
+    """
+    def __init__(self, levels:Iterable[str]=(), grep:Optional[str]=None, exclude:Optional[str]=None,
+                 stream_prefix:Optional[str]=None, since:Optional[int]=None, until:Optional[int]=None):
+        self.levels = tuple(level.upper() for level in levels)
+        self.grep = grep
+        self.exclude = exclude
+        self.stream_prefix = stream_prefix
+        self.since = since
+        self.until = until
+        self._matches = self._compile()
+
+    def __repr__(self):
+        criteria = ', '.join(
+            f'{name}={value!r}'
+            for name, value in vars(self).items()
+            if not name.startswith('_') and value not in (None, ())
+        )
+
+        return f'{type(self).__name__}({criteria})'
+
+    def accepts(self, raw:dict, stream_name:Optional[str]=None) -> bool:
+        if not self.accepts_stream(stream_name or raw.get('logStreamName') or raw.get('stream') or ''):
+            return False
+
+        return self._matches(raw)
+
+    def accepts_stream(self, stream_name:str) -> bool:
+        return not self.stream_prefix or stream_name.startswith(self.stream_prefix)
+
+    def filter(self, raw_events:List[dict], stream_name:Optional[str]=None) -> List[dict]:
+        """
+        Keep the raw events which pass the filter. When they all come from the same stream, give its name
+        to check it only once.
+        """
+        if stream_name is not None:
+            if not self.accepts_stream(stream_name):
+                return []
+
+            matches = self._matches
+
+            return [raw for raw in raw_events if matches(raw)]
+
+        accepts = self.accepts
+
+        return [raw for raw in raw_events if accepts(raw)]
+
+    def _compile(self) -> Callable[[dict], bool]:
+        checks = []
+        since = self.since
+        until = self.until
+
+        if since is not None:
+            checks.append(lambda raw: raw['timestamp'] >= since)
+
+        if until is not None:
+            checks.append(lambda raw: raw['timestamp'] <= until)
+
+        if self.levels:
+            match_level = compile(r'\s*\[(?:' + '|'.join(escape(level) for level in self.levels) + r')\]\t').match
+            checks.append(lambda raw: match_level(raw['message']) is not None)
+
+        if self.grep:
+            search = compile(self.grep).search
+            checks.append(lambda raw: search(raw['message']) is not None)
+
+        if self.exclude:
+            search_excluded = compile(self.exclude).search
+            checks.append(lambda raw: search_excluded(raw['message']) is None)
+
+        if not checks:
+            return lambda raw: True
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def matches(raw:dict) -> bool:
+            for check in checks:
+                if not check(raw):
+                    return False
+
+            return True
+
+        return matches
@@ -0,0 +1,101 @@
+from heapq import heappop, heappush
+from itertools import count
+
+
+class WatermarkMerge(object):
+    """
+    Lazy k-way merge of time-ordered event pages
+
+    Every source (e.g., a log stream) pushes its pages in timestamp order. An event is released as soon as
+    no open source can still produce an earlier one, i.e., once its timestamp is behind the watermark, the
+    lowest of the latest timestamps of the open sources. Only the events waiting for the watermark are
+    kept in the heap.
+    """
+    def __init__(self):
+        self._heap = []
+        self._marks = dict()  # open source -> latest pushed timestamp (None until its first page)
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def watermark(self):
+        """
+        The timestamp before which every buffered event can be released (None when blocked by a source
+        which has not pushed anything yet).
+        """
+        marks = self._marks
+
+        if not marks:
+            return float('inf')
+
+        lowest = None
+
+        for mark in marks.values():
+            if mark is None:
+                return None
+
+            if lowest is None or mark < lowest:
+                lowest = mark
+
+        return lowest
+
+    def laggard(self):
+        """
+        The open source holding back the watermark, if any
+        """
+        lowest_source = None
+        lowest = None
+
+        for source, mark in self._marks.items():
+            if mark is None:
+                return source
+
+            if lowest is None or mark < lowest:
+                lowest_source = source
+                lowest = mark
+
+        return lowest_source
+
+    def open(self, *sources):
+        for source in sources:
+            self._marks.setdefault(source, None)
+
+    def close(self, source):
+        """
+        Tell that the source has nothing more to give for now.
+        """
+        self._marks.pop(source, None)
+
+    def push(self, source, events):
+        if not events:
+            return
+
+        heap = self._heap
+        sequence = self._sequence
+
+        for event in events:
+            heappush(heap, (event.timestamp, next(sequence), event))
+
+        mark = self._marks.get(source)
+        latest = events[-1].timestamp
+
+        if source in self._marks and (mark is None or latest > mark):
+            self._marks[source] = latest
+
+    def release(self):
+        """
+        Pop the events behind the watermark in timestamp order.
+        """
+        watermark = self.watermark
+        heap = self._heap
+        released = []
+
+        if watermark is None:
+            return released
+
+        while heap and heap[0][0] < watermark:
+            released.append(heappop(heap)[2])
+
+        return released
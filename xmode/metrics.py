@@ -0,0 +1,214 @@
+from bisect import bisect_left
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+lag_buckets = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Counter(object):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount:float=1):
+        self.value += amount
+
+
+class Gauge(object):
+    """
+    Value which goes up and down, e.g., the depth of a queue
+    """
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value:float):
+        self.value = value
+
+
+class Histogram(object):
+    """
+    Distribution of observed values over fixed buckets (upper bounds, the last one being infinite)
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets:Tuple[float, ...]=latency_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value:float, count:int=1):
+        """
+        Observe the value, ``count`` times (e.g., the average of a batch, once per item).
+        """
+        self.counts[bisect_left(self.buckets, value)] += count
+        self.count += count
+        self.sum += value * count
+
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, quantile:float) -> float:
+        """
+        Estimate the quantile as the upper bound of the bucket it falls into (capped by the maximum).
+        """
+        if not self.count:
+            return 0.0
+
+        rank = quantile * self.count
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+            seen += count
+
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+
+        return self.max
+
+
+class Metrics(object):
+    """
+    Counters, gauges and histograms of a tail, by name and labels
+
+    The metrics are created on first use and cached, so the hot paths only pay for a dictionary lookup and
+    an addition. The updates are not locked: a few increments may be lost when many threads update the same
+    metric at once, which is acceptable for monitoring.
+    """
+    def __init__(self):
+        self.started_at = time()
+        self._counters = dict()  # type: Dict[Tuple[str, tuple], Counter]
+        self._gauges = dict()  # type: Dict[Tuple[str, tuple], Gauge]
+        self._histograms = dict()  # type: Dict[Tuple[str, tuple], Histogram]
+        self._handler_histograms = dict()  # (event name, callback) -> Histogram
+        self._lock = Lock()
+
+    def counter(self, name:str, **labels) -> Counter:
+        key = (name, tuple(sorted(labels.items())))
+        counter = self._counters.get(key)
+
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+
+        return counter
+
+    def gauge(self, name:str, **labels) -> Gauge:
+        key = (name, tuple(sorted(labels.items())))
+        gauge = self._gauges.get(key)
+
+        if gauge is None:
+            with self._lock:
+                gauge = self._gauges.setdefault(key, Gauge())
+
+        return gauge
+
+    def histogram(self, name:str, buckets:Tuple[float, ...]=latency_buckets, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+
+        return histogram
+
+    def handler_histogram(self, event_name:str, callback:Callable) -> Histogram:
+        """
+        Histogram of the time spent in the handler, in seconds
+        """
+        histogram = self._handler_histograms.get((event_name, callback))
+
+        if histogram is None:
+            histogram = self._handler_histograms[(event_name, callback)] = self.histogram(
+                'handler_seconds', event=event_name, handler=_get_callable_name(callback)
+            )
+
+        return histogram
+
+    def counters(self) -> List[Tuple[str, tuple, Counter]]:
+        return [(name, labels, counter) for (name, labels), counter in sorted(list(self._counters.items()),
+                                                                              key=lambda item: item[0])]
+
+    def gauges(self) -> List[Tuple[str, tuple, Gauge]]:
+        return [(name, labels, gauge) for (name, labels), gauge in sorted(list(self._gauges.items()),
+                                                                          key=lambda item: item[0])]
+
+    def histograms(self) -> List[Tuple[str, tuple, Histogram]]:
+        return [(name, labels, histogram) for (name, labels), histogram in sorted(list(self._histograms.items()),
+                                                                                  key=lambda item: item[0])]
+
+    def report(self) -> str:
+        """
+        Summary of every metric, as a text table
+        """
+        elapsed = max(time() - self.started_at, 1e-9)
+        counters = [(_format_name(name, labels), counter) for name, labels, counter in self.counters()]
+        gauges = [(_format_name(name, labels), gauge) for name, labels, gauge in self.gauges()]
+        histograms = [(_format_name(name, labels), histogram) for name, labels, histogram in self.histograms()]
+        width = max([len(name) for name, _ in counters + gauges + histograms] or [0])
+        lines = [f'Metrics after {elapsed:.1f}s']
+
+        for name, counter in counters:
+            lines.append(f'  {name:<{width}} {counter.value:>12,} ({counter.value / elapsed:,.1f}/s)')
+
+        for name, gauge in gauges:
+            lines.append(f'  {name:<{width}} {gauge.value:>12,.4g}')
+
+        for name, histogram in histograms:
+            lines.append(f'  {name:<{width}} {histogram.count:>12,} '
+                         f'(mean {histogram.mean:.4g}, p50 {histogram.quantile(0.5):.4g}, '
+                         f'p99 {histogram.quantile(0.99):.4g}, max {histogram.max:.4g})')
+
+        return '\n'.join(lines)
+
+
+class MetricsReporter(object):
+    """
+    Report of the metrics on ``done`` and, when ``interval`` is given, at the end of the polls at least
+    ``interval`` seconds apart
+    """
+    def __init__(self, metrics:Metrics, interval:Optional[float]=None, write:Callable[[str], None]=print):
+        self.metrics = metrics
+        self.interval = interval
+        self.write = write
+        self._reported_at = time()
+
+    def attach(self, source):
+        if self.interval:
+            source.on('poll.done', self.report_if_due)
+
+        source.on('done', self.report)
+
+    def report_if_due(self):
+        if time() - self._reported_at >= self.interval:
+            self.report()
+
+    def report(self):
+        self._reported_at = time()
+        self.write(self.metrics.report())
+
+
+def _format_name(name:str, labels:tuple) -> str:
+    if not labels:
+        return name
+
+    return name + '{' + ','.join(f'{key}={value}' for key, value in labels) + '}'
+
+
+def _get_callable_name(callback:Callable) -> str:
+    callback = getattr(callback, 'func', callback)  # functools.partial
+    name = getattr(callback, '__qualname__', None) or type(callback).__name__
+    module = getattr(callback, '__module__', None)
+
+    return f'{module}.{name}' if module else name
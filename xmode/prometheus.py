@@ -0,0 +1,173 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from logging import getLogger
+import os
+from threading import Thread
+from time import time
+
+from xmode.event import EventDrivenObject
+from xmode.metrics import Metrics
+
+_logger = getLogger(__name__)
+
+content_type = 'text/plain; version=0.0.4; charset=utf-8'
+metric_prefix = 'xmode_'
+
+
+def to_text(metrics:Metrics) -> str:
+    """
+    Render the metrics in the Prometheus text exposition format.
+
+    The counters, gauges and histograms are read without any lock: every value is consistent on its own but the
+    values may come from slightly different moments.
+    """
+    lines = []
+    typed = set()
+
+    for name, labels, counter in metrics.counters():
+        full_name = f'{metric_prefix}{name}_total'
+
+        if full_name not in typed:
+            typed.add(full_name)
+            lines.append(f'# TYPE {full_name} counter')
+
+        lines.append(f'{full_name}{_format_labels(labels)} {_format_value(counter.value)}')
+
+    for name, labels, gauge in metrics.gauges():
+        full_name = f'{metric_prefix}{name}'
+
+        if full_name not in typed:
+            typed.add(full_name)
+            lines.append(f'# TYPE {full_name} gauge')
+
+        lines.append(f'{full_name}{_format_labels(labels)} {_format_value(gauge.value)}')
+
+    for name, labels, histogram in metrics.histograms():
+        full_name = f'{metric_prefix}{name}'
+        counts = list(histogram.counts)
+        total = histogram.sum
+        cumulative = 0
+
+        if full_name not in typed:
+            typed.add(full_name)
+            lines.append(f'# TYPE {full_name} histogram')
+
+        for bound, count in zip(histogram.buckets, counts):
+            cumulative += count
+            lines.append(f'{full_name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}')
+
+        cumulative += counts[-1]
+        lines.append(f'{full_name}_bucket{_format_labels(labels, le="+Inf")} {cumulative}')
+        lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(total)}')
+        lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer(object):
+    """
+    HTTP endpoint serving the metrics to Prometheus (or any compatible scraper) from a background thread
+    """
+    def __init__(self, metrics:Metrics, port:int, host:str=''):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def attach(self, source:EventDrivenObject):
+        source.on('done', self.close)
+
+        self.start()
+
+    def start(self):
+        if self._server:
+            return
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+
+                body = to_text(metrics).encode('utf-8')
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                _logger.debug(f'{self.address_string()}: {format % args}')
+
+        self._server = HTTPServer((self.host, self.port), Handler)
+        self._thread = Thread(target=self._server.serve_forever, name='xmode-metrics', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if not self._server:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+        self._server = None
+        self._thread = None
+
+
+class TextfileExporter(object):
+    """
+    Metrics written to a file in the Prometheus text format, e.g., for the textfile collector of the node
+    exporter
+
+    The file is written at the end of the polls at least ``interval`` seconds apart and when the source is
+    done, and replaced atomically so that a scraper never reads a half-written file.
+    """
+    def __init__(self, metrics:Metrics, path:str, interval:float=10):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._written_at = None
+
+    def attach(self, source:EventDrivenObject):
+        source.on('poll.done', self.write_if_due)
+        source.on('done', self.write)
+
+    def write_if_due(self):
+        if self._written_at is None or time() - self._written_at >= self.interval:
+            self.write()
+
+    def write(self):
+        self._written_at = time()
+        temp_path = f'{self.path}.tmp'
+
+        try:
+            with open(temp_path, 'w') as f:
+                f.write(to_text(self.metrics))
+
+            os.replace(temp_path, self.path)
+        except OSError:
+            _logger.exception(f'{self.path}: Failed to write the metrics')
+
+
+def _format_labels(labels:tuple, **extra_labels) -> str:
+    pairs = list(labels) + list(extra_labels.items())
+
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value:float) -> str:
+    if isinstance(value, int):
+        return str(value)
+
+    return repr(float(value))
@@ -1,17 +1,31 @@
-from dataclasses import dataclass
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime
 import logging
 from pprint import pformat
+from queue import Full, Queue
 from re import compile
-from time import sleep, time
-from typing import Optional
+import threading
+from time import perf_counter, sleep, time
+from typing import List, Optional
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from gallium.interface import ICommand
+from xmode.checkpoint import CheckpointFile
+from xmode.dedup import EventDeduplicator
 from xmode.event import EventDrivenObject
+from xmode.filters import EventFilter
+from xmode.metrics import Metrics, lag_buckets
+from xmode.merge import WatermarkMerge
+from xmode.utils.backoff import SharedBackoff
 from xmode.utils.log_factory import make_basic_logger
+from xmode.utils.polling import PollScheduler
 
 module_logger = make_basic_logger(__name__, logging.DEBUG)
+throttling_error_codes = ('ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded')
 re_lambda_message = compile(r'^\[(?P<level>[A-Z]+)\]\t(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}.\d{3}Z)\t(?P<request_id>[A-Za-z\d\-]+)\t(?P<message>.*)$')
 
 
@@ -23,15 +37,12 @@ def to_stdout(obj):
 
 
 def event_to_stdout(event):
-    ts = datetime.utcfromtimestamp(event.timestamp / 1000).strftime('%Y.%m.%d %H:%M:%S')
-    message = event.message.strip()
-    matches = re_lambda_message.search(message)
+    ts = event.utc_time.strftime('%Y.%m.%d %H:%M:%S')
 
-    if not matches:
-        module_logger.info(f"{ts}: [?] {message}")
+    if not event.is_lambda:
+        module_logger.info(f"{ts}: [?] {event.body}")
     else:
-        context = matches.groupdict()
-        module_logger.info(f"{ts}: [LAMBDA] {context.get('level')}: {context.get('request_id')}: {context.get('message')}")
+        module_logger.info(f"{ts}: [LAMBDA] {event.level}: {event.request_id}: {event.body}")
 
 
 class SessionFactory(object):
@@ -44,103 +55,806 @@ class SessionFactory(object):
         return boto3
 
 
-class CloudWatchLogs(EventDrivenObject):
-    backoff_period = 1  # one second back-off
+class LogTailer(EventDrivenObject):
+    """
+    Tail, either blocking or asynchronous, driven by the poller of the subclass
+
+    Every event is dispatched to the handlers of ``event``. The handlers of ``events.batch`` receive the
+    same events as lists (in timestamp order), one list per page. ``poll.done`` is triggered at the end of
+    every poll.
+    """
+    api_calls = 0  # API calls made so far
+    finished = False  # whether the last poll has reached the end of the time range, so no other poll is due
+    events_fetched = 0  # raw events fetched so far, before any filtering or de-duplication
+    ingestion_lag = 0  # total ingestion lag of the raw events fetched so far, in milliseconds
+
+    def tail(self, max_streams:int=5, follow:bool=False, initial_offset:int=900,
+             filter_pattern:Optional[str]=None, stream_prefix:Optional[str]=None,
+             scheduler:Optional[PollScheduler]=None):
+        """
+        Tail the log group(s).
+
+        By default, the events are pulled from the ``max_streams`` most recently active streams. With a
+        ``filter_pattern`` and/or a ``stream_prefix``, the whole log group is searched on the server side
+        with ``filter_log_events`` and only the matching events are transferred. When following, the
+        ``scheduler`` decides how long to wait between the polls.
+        """
+        trigger = self.trigger
+        trigger_each = self.trigger_each
+        scheduler = scheduler or PollScheduler()
+        batches = self._iterate_batches(max_streams, initial_offset, filter_pattern, stream_prefix)
+
+        try:
+            for batch in batches:
+                if batch is None:
+                    trigger('poll.done')
+
+                    if not follow or self.finished:
+                        break
+
+                    sleep(scheduler.next_interval(self.api_calls, self.events_fetched, self.ingestion_lag))
+
+                    continue
+
+                if self.metrics is not None:
+                    self._record_dispatch(batch)
+
+                trigger('events.batch', batch)
+                trigger_each('event', batch)
+        except KeyboardInterrupt:
+                pass
+        finally:
+            batches.close()
+
+        self.trigger('done')
+
+    async def atail(self, max_streams:int=5, follow:bool=False, initial_offset:int=900,
+                    filter_pattern:Optional[str]=None, stream_prefix:Optional[str]=None,
+                    timeout:Optional[float]=None, executor:Optional[Executor]=None,
+                    scheduler:Optional[PollScheduler]=None):
+        """
+        Tail the log group(s) as an asynchronous iterator of events.
+
+        This works like ``tail`` but the blocking API calls run on the executor (the default executor of
+        the event loop if not given), one page at a time, and the handlers, either plain functions or
+        coroutine functions, are awaited before each event is yielded. ``asyncio.TimeoutError`` is raised
+        when a page takes longer than ``timeout`` seconds. The tail stops when the task is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        scheduler = scheduler or PollScheduler()
+        batches = self._iterate_batches(max_streams, initial_offset, filter_pattern, stream_prefix)
+        pending = None
+
+        try:
+            while True:
+                pending = loop.run_in_executor(executor, next, batches, StopIteration)
+                done, _ = await asyncio.wait([pending], timeout=timeout)
+
+                if not done:
+                    raise asyncio.TimeoutError(f'{self}: No page after {timeout} second(s)')
+
+                batch = pending.result()
+                pending = None
+
+                if batch is StopIteration:
+                    break
 
-    def __init__(self, session, log_group_name:str):
+                if batch is None:
+                    await self.atrigger('poll.done')
+
+                    if not follow or self.finished:
+                        break
+
+                    await asyncio.sleep(scheduler.next_interval(self.api_calls, self.events_fetched,
+                                                                self.ingestion_lag))
+
+                    continue
+
+                if self.metrics is not None:
+                    self._record_dispatch(batch)
+
+                await self.atrigger('events.batch', batch)
+
+                for event in batch:
+                    await self.atrigger('event', event)
+
+                    yield event
+        finally:
+            if pending and not pending.done():
+                # The page is still being fetched on the executor.
+                pending.add_done_callback(lambda _: batches.close())
+            else:
+                batches.close()
+
+            await self.atrigger('done')
+
+    def _record_dispatch(self, batch:List['Event']):
+        metrics = self.metrics
+        lag = time() - sum(event.timestamp for event in batch) / len(batch) / 1000
+
+        metrics.counter('events_dispatched').inc(len(batch))
+        metrics.histogram('event_lag_seconds', lag_buckets).observe(lag, len(batch))
+
+    def _iterate_batches(self, max_streams:int, initial_offset:int, filter_pattern:Optional[str],
+                         stream_prefix:Optional[str]):
+        """
+        Poll over and over and yield the events ready for dispatch as lists, in timestamp order. ``None``
+        marks the end of each poll.
+        """
+        raise NotImplementedError()
+
+
+class CloudWatchLogs(LogTailer):
+    dedup_window = 900  # seconds behind the newest event to remember for de-duplication
+    max_throttle_retries = 10  # consecutive throttles before giving up
+    stream_ttl = 30  # seconds to trust the discovered streams before describing them again
+    stream_retention = 3600  # seconds without any event before a stream is retired
+    filter_lookback = 60  # seconds to look back for late-ingested events when tailing with a filter
+    max_retired_cursors = 1000  # cursors of the retired streams to keep in case the streams become active again
+    until_grace = 60  # seconds to keep following past the end of the time range for the late-ingested events
+
+    def __init__(self, session, log_group_name:str, max_workers:int=1, client=None,
+                 backoff:Optional[SharedBackoff]=None, checkpoint:Optional[CheckpointFile]=None,
+                 event_filter:Optional[EventFilter]=None, metrics:Optional[Metrics]=None):
         super().__init__()
 
         self.session = session
-        self.client = self.session.client('logs')
+        self.max_workers = max(1, max_workers)
+        self.client = client or self.session.client('logs', config=Config(max_pool_connections=max(10, self.max_workers)))
         self.log_group_name = log_group_name
         self._streams = None
-
-    def tail(self, max_streams:int=5, follow:bool=False, initial_offset:int=900):
-        offset = initial_offset
-        trigger_event = self.trigger
-        events = []
+        self._stream_registry = None
+        self._cursors = dict()  # stream name -> nextForwardToken
+        self._retired_cursors = OrderedDict()  # stream name -> nextForwardToken, the least recently retired first
+        self._filter_cursor = None  # the newest timestamp searched by filter_log_events
+        self._backoff = backoff or SharedBackoff()
+        self._restored_watermark = None  # the newest timestamp dispatched before the checkpoint
+        self._watermark = None  # the newest timestamp released so far
+        self._totals_lock = threading.Lock()  # for api_calls, events_fetched and ingestion_lag, shared by the workers
+        self.checkpoint = checkpoint
+        self.event_filter = event_filter  # checked on the raw events, before they become Event
+        self.metrics = metrics
+
+        if checkpoint:
+            self._restore(checkpoint.get(log_group_name))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.log_group_name})'
+
+    def _iterate_batches(self, max_streams:int, initial_offset:int, filter_pattern:Optional[str],
+                         stream_prefix:Optional[str], coordinated:bool=False):
+        """
+        With ``coordinated``, the progress is never committed here: the coordinator (e.g.,
+        ``MultiCloudWatchLogs``) calls ``_commit`` once the events it has released have been dispatched.
+        """
+        group_wide = bool(filter_pattern or stream_prefix)
+        watermark = self._watermark = self._restored_watermark
+        start_time = watermark + 1 if watermark is not None else int((time() - initial_offset) * 1000)
+
+        if self.event_filter and self.event_filter.since is not None:
+            start_time = max(start_time, self.event_filter.since) if watermark is not None else self.event_filter.since
+
+        until = self.event_filter.until if self.event_filter else None
+        seen = EventDeduplicator(self.dedup_window * 1000)
+        merger = WatermarkMerge()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        poll_done = False
 
         try:
             while True:
-                self._get_latest_log_streams(max_streams)
+                if group_wide:
+                    sources = [self.log_group_name]
+                    pages = self._fetch_filtered_pages(start_time, filter_pattern, stream_prefix)
+                else:
+                    self._get_latest_log_streams(max_streams, start_time)
 
-                for stream in self._streams:
-                    for event in self._iterate_event_batch(stream['logStreamName'], offset=offset):
-                        if event in events:
-                            continue
+                    sources = [stream['logStreamName'] for stream in self._streams]
+                    pages = self._fetch_pages(merger, sources, start_time, executor)
 
-                        events.append(event)
+                merger.open(*sources)
 
-                events.sort(key=lambda x: x.timestamp)
+                for source, page in pages:
+                    if page is None:
+                        merger.close(source)
+                    else:
+                        unseen = [event for event in page if seen.add(event)]
 
-                for event in events:
-                    if event.notified:
-                        continue
+                        if self.metrics is not None and len(unseen) < len(page):
+                            self.metrics.counter('events_duplicated', log_group=self.log_group_name).inc(len(page) - len(unseen))
 
-                    trigger_event('event', event)
-                    event.notified = True
+                        merger.push(source, unseen)
 
-                if not follow:
-                    break
+                    released = merger.release()
 
-                sleep(self.backoff_period) # Pause for a bit
+                    if released:
+                        if watermark is None or released[-1].timestamp > watermark:
+                            watermark = self._watermark = released[-1].timestamp
 
-                offset = max_streams + self.backoff_period
-        except KeyboardInterrupt:
-                pass
+                        yield released
 
-        self.trigger('done')
+                poll_done = True
+                self.finished = until is not None and self._is_past(until)
+
+                yield None
+
+                # Once the consumer comes back, everything fetched so far has been dispatched.
+                if not coordinated:
+                    self._commit()
+
+                poll_done = False
+
+                if self.finished:
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+            if self.checkpoint and not coordinated:
+                if poll_done:
+                    self._commit()
+
+                self.checkpoint.save(force=True)
+
+    def _is_past(self, until:int) -> bool:
+        """
+        Tell whether the tail has reached the end of the time range: either an event at the end has been
+        released, or the end is more than ``until_grace`` seconds ago and no late-ingested event is expected.
+        """
+        if self._watermark is not None and self._watermark >= until:
+            return True
+
+        return time() > until / 1000 + self.until_grace
+
+    def _restore(self, state:Optional[dict]):
+        if not state:
+            return
+
+        self._cursors.update(state['cursors'])
+
+        self._restored_watermark = state.get('watermark')
+
+    def _commit(self):
+        """
+        Record the progress into the checkpoint. The streams without any cursor will resume right after the
+        watermark.
+        """
+        if not self.checkpoint:
+            return
+
+        self.checkpoint.update(self.log_group_name, dict(cursors=dict(self._cursors), watermark=self._watermark))
+        self.checkpoint.save()
+
+    def _fetch_pages(self, merger:WatermarkMerge, stream_names:List[str], start_time:int,
+                     executor:Optional[ThreadPoolExecutor]=None):
+        """
+        Fetch the new events of every stream and yield ``(stream name, page)`` as each page arrives.
+
+        A stream is done when it yields ``(stream name, None)``. Without an executor, the next page always
+        comes from the stream holding back the watermark of the merger so that only a few pages per stream
+        are buffered. With an executor, the streams are paged concurrently with the shared client and the
+        pages are handed over through a bounded queue.
+        """
+        if not executor:
+            pages = {stream_name: self._iterate_event_pages(stream_name, start_time) for stream_name in stream_names}
+
+            while pages:
+                stream_name = merger.laggard() or next(iter(pages))
+                page = next(pages[stream_name], None) if stream_name in pages else None
+
+                if page is None:
+                    pages.pop(stream_name, None)
+
+                yield stream_name, page
+
+            return
+
+        pipe = Queue(maxsize=self.max_workers * 2)
+        stopped = threading.Event()
+        futures = [
+            executor.submit(self._pump_pages, pipe, stopped, stream_name, start_time)
+            for stream_name in stream_names
+        ]
+        remaining = len(futures)
+
+        try:
+            while remaining:
+                stream_name, page, error = pipe.get()
+
+                if error:
+                    raise error
+
+                if page is None:
+                    remaining -= 1
+
+                yield stream_name, page
+        finally:
+            stopped.set()
+
+    def _fetch_filtered_pages(self, start_time:int, filter_pattern:Optional[str], stream_prefix:Optional[str]):
+        """
+        Search the whole log group and yield ``(log group name, page)`` as each page arrives, then
+        ``(log group name, None)``.
+
+        Every search starts a little (see ``filter_lookback``) before the start of the previous search, or
+        the newest event it found if that is later, to catch the late-ingested events. The overlap is taken
+        care of by the de-duplication.
+        """
+        searched_at = int(time() * 1000)
+
+        if self._filter_cursor is not None:
+            start_time = max(start_time, self._filter_cursor - self.filter_lookback * 1000)
+
+        for page in self._iterate_filtered_event_pages(start_time, filter_pattern, stream_prefix):
+            yield self.log_group_name, page
+
+        # Move on even when nothing has matched, so that the next search does not go over the same range.
+        if self._filter_cursor is None or searched_at > self._filter_cursor:
+            self._filter_cursor = searched_at
+
+        yield self.log_group_name, None
+
+    def _pump_pages(self, pipe:Queue, stopped:threading.Event, stream_name:str, start_time:int):
+        """
+        Page through the stream on a worker thread until it is exhausted or the consumer has stopped.
+        """
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    pipe.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+
+            return False
+
+        try:
+            for page in self._iterate_event_pages(stream_name, start_time):
+                if not put((stream_name, page, None)):
+                    return
+        except Exception as e:
+            put((stream_name, None, e))
+        else:
+            put((stream_name, None, None))
+
+    def _call(self, operation_name:str, **params):
+        """
+        Call the API operation, backing off together with the other workers whenever it is throttled.
+        """
+        backoff = self._backoff
+        metrics = self.metrics
+
+        while True:
+            backoff.wait()
+
+            with self._totals_lock:
+                self.api_calls += 1
+
+            started_at = perf_counter()
+
+            try:
+                response = getattr(self.client, operation_name)(**params)
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code')
+
+                if metrics is not None:
+                    metrics.counter('api_errors', operation=operation_name, code=error_code).inc()
+
+                if error_code not in throttling_error_codes:
+                    raise
+
+                if backoff.attempts >= self.max_throttle_retries:
+                    raise
+
+                module_logger.debug(f'{operation_name} is throttled, backing off (attempt #{backoff.attempts + 1})')
+                backoff.throttled()
+
+                continue
+
+            backoff.succeeded()
 
-    def _iterate_event_batch(self, stream_name:str, offset:int, next_token:str=None):
-        params = dict(logGroupName=self.log_group_name, logStreamName=stream_name, startTime=int(time() - offset))
+            if metrics is not None:
+                self._record_call(operation_name, response, perf_counter() - started_at)
+
+            return response
+
+    def _record_call(self, operation_name:str, response:dict, elapsed:float):
+        metrics = self.metrics
+        content_length = response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('content-length')
+
+        metrics.counter('api_calls', operation=operation_name).inc()
+        metrics.histogram('api_call_seconds', operation=operation_name).observe(elapsed)
+
+        if content_length:
+            metrics.counter('api_bytes', operation=operation_name).inc(int(content_length))
+
+    def _accept(self, raw_events:List[dict], stream_name:Optional[str]=None) -> List[dict]:
+        """
+        Keep the raw events of a page which pass the event filter, counting them along the way.
+        """
+        kept = self.event_filter.filter(raw_events, stream_name) if self.event_filter else raw_events
+        metrics = self.metrics
+
+        ingestion_lag = sum(event['ingestionTime'] - event['timestamp'] for event in raw_events)
+
+        # The poll scheduler follows the activity of the log group, whatever is filtered out afterwards.
+        with self._totals_lock:
+            self.events_fetched += len(raw_events)
+            self.ingestion_lag += ingestion_lag
+
+        if metrics is not None:
+            metrics.counter('pages', log_group=self.log_group_name).inc()
+            metrics.counter('events_fetched', log_group=self.log_group_name).inc(len(raw_events))
+
+            if len(kept) < len(raw_events):
+                metrics.counter('events_filtered', log_group=self.log_group_name).inc(len(raw_events) - len(kept))
+
+        return kept
+
+    def _iterate_event_pages(self, stream_name:str, start_time:int):
+        """
+        Iterate over the pages of the events of the stream which have not been fetched yet.
+
+        The first call for a stream starts from ``start_time`` (in milliseconds). Every page moves
+        the cursor of the stream forward so that the next call only returns the newer events.
+        The next page is only requested when the consumer asks for it.
+        """
+        log_group_name = self.log_group_name
+        event_filter = self.event_filter
+        params = dict(logGroupName=log_group_name, logStreamName=stream_name, startFromHead=True)
+        next_token = self._cursors.get(stream_name)
+
+        if event_filter and event_filter.until is not None:
+            params['endTime'] = event_filter.until + 1  # exclusive
 
         if next_token:
             params['nextToken'] = next_token
+        else:
+            params['startTime'] = start_time
+
+        while True:
+            logs_batch = self._call('get_log_events', **params)
+            forward_token = logs_batch.get('nextForwardToken')
+
+            if forward_token:
+                self._cursors[stream_name] = forward_token
+
+            raw_events = logs_batch['events']
+
+            if not raw_events:
+                return
+
+            raw_events = self._accept(raw_events, stream_name)
+
+            if raw_events:
+                yield [
+                    Event(stream=stream_name, log_group=log_group_name, **event)
+                    for event in raw_events
+                ]
+
+            if not forward_token or forward_token == params.get('nextToken'):
+                return  # The stream gives back the same token when there is no more event to go on.
+
+            params.pop('startTime', None)
+            params['nextToken'] = forward_token
+
+    def _iterate_filtered_event_pages(self, start_time:int, filter_pattern:Optional[str],
+                                      stream_prefix:Optional[str]):
+        """
+        Iterate over the pages of the events of the whole log group which match the filter pattern.
+        """
+        event_filter = self.event_filter
+        params = dict(logGroupName=self.log_group_name, startTime=start_time)
 
-        logs_batch = self.client.get_log_events(**params)
+        if event_filter and event_filter.until is not None:
+            params['endTime'] = event_filter.until
 
-        events = logs_batch['events']
+        if filter_pattern:
+            params['filterPattern'] = filter_pattern
 
-        if 'nextToken' in logs_batch:
-            events.extend(self._iterate_event_batch(stream_name, offset, logs_batch['nextToken']))
-            # Recursively iterate until there is no more event to go on.
+        if stream_prefix:
+            params['logStreamNamePrefix'] = stream_prefix
 
-        return [Event(stream=stream_name, notified=False, **event) for event in events]
+        while True:
+            logs_batch = self._call('filter_log_events', **params)
+            raw_events = logs_batch['events']
 
+            if raw_events:
+                newest_timestamp = max(event['timestamp'] for event in raw_events)
+
+                if self._filter_cursor is None or newest_timestamp > self._filter_cursor:
+                    self._filter_cursor = newest_timestamp
+
+                raw_events = self._accept(raw_events)
+
+            if raw_events:
+                page = [
+                    Event(timestamp=event['timestamp'],
+                          message=event['message'],
+                          stream=event['logStreamName'],
+                          ingestionTime=event['ingestionTime'],
+                          log_group=self.log_group_name)
+                    for event in raw_events
+                ]
+                page.sort(key=lambda x: x.timestamp)
+
+                yield page
+
+            if 'nextToken' not in logs_batch:
+                return
+
+            params['nextToken'] = logs_batch['nextToken']
+
+    def _get_latest_log_streams(self, limit:int, start_time:Optional[int]=None):
+        registry = self._stream_registry
+
+        if not registry or registry.limit != limit or registry.since != start_time:
+            registry = self._stream_registry = LogStreamRegistry(self, limit, self.stream_ttl, self.stream_retention,
+                                                                 start_time)
+
+        if not registry.refresh():
+            return
+
+        self._streams = registry.streams
+        cursors = self._cursors
+        retired_cursors = self._retired_cursors
+
+        for stream_name in [stream_name for stream_name in cursors if stream_name not in registry]:
+            retired_cursors[stream_name] = cursors.pop(stream_name)
+
+        while len(retired_cursors) > self.max_retired_cursors:
+            retired_cursors.popitem(last=False)
+
+        # A stream becoming active again resumes where it was left rather than from the start of the tail.
+        for stream in self._streams:
+            stream_name = stream['logStreamName']
+
+            if stream_name in retired_cursors:
+                cursors[stream_name] = retired_cursors.pop(stream_name)
 
-    def _get_latest_log_streams(self, limit:int):
-        self._streams = []
-        self._iterate_log_stream_batches(limit)
-        self._streams.sort(key=lambda x: x['creationTime'])
         self.trigger('all_streams.ready', self._streams)
 
-    def _iterate_log_stream_batches(self, limit, next_token:str=None):
+    def _iterate_log_streams(self, limit:int):
+        """
+        Iterate over up to ``limit`` log streams, the most recently active first.
+        """
         params = dict(logGroupName=self.log_group_name,
                       orderBy='LastEventTime',
-                      limit=limit,
+                      limit=min(limit, 50),
                       descending=True)
+        count = 0
 
-        if next_token:
-            params['nextToken'] = next_token
+        while True:
+            stream_batch = self._call('describe_log_streams', **params)
+
+            for stream in stream_batch['logStreams']:
+                yield stream
+                count += 1
 
-        stream_batch = self.client.describe_log_streams(**params)
+                if count >= limit:
+                    return
 
-        self._streams.extend(stream_batch['logStreams'])
+            if 'nextToken' not in stream_batch:
+                return
 
-        if len(self._streams) < limit and 'nextToken' in stream_batch:
-            self._iterate_log_stream_batches(stream_batch['nextToken'])
-            # Recursively iterate until there is no more stream to go on.
+            params['nextToken'] = stream_batch['nextToken']
+
+
+class MultiCloudWatchLogs(LogTailer):
+    """
+    Tail many log groups at once
+
+    All log groups share one client (and its connection pool) and one throttling back-off. Every round, the
+    groups take turns to fetch one page each, and their events are merged into one time-ordered sequence.
+    Each event tells which log group it comes from (``Event.log_group``).
+    """
+    def __init__(self, session, log_group_names:List[str], max_workers:int=1,
+                 checkpoint:Optional[CheckpointFile]=None, event_filter:Optional[EventFilter]=None,
+                 metrics:Optional[Metrics]=None):
+        super().__init__()
+
+        self.session = session
+        self.metrics = metrics
+        self.checkpoint = checkpoint
+        self.max_workers = max(1, max_workers)
+        pool_size = max(10, self.max_workers * len(log_group_names))
+        self.client = self.session.client('logs', config=Config(max_pool_connections=pool_size))
+        self._backoff = SharedBackoff()
+        self.groups = [
+            CloudWatchLogs(session, log_group_name, max_workers,
+                           client=self.client, backoff=self._backoff, checkpoint=checkpoint,
+                           event_filter=event_filter, metrics=metrics)
+            for log_group_name in log_group_names
+        ]
+
+        for group in self.groups:
+            group.on('all_streams.ready', self._on_streams_ready)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(group.log_group_name for group in self.groups)})'
+
+    @property
+    def api_calls(self) -> int:
+        return sum(group.api_calls for group in self.groups)
+
+    @property
+    def events_fetched(self) -> int:
+        return sum(group.events_fetched for group in self.groups)
+
+    @property
+    def ingestion_lag(self) -> int:
+        return sum(group.ingestion_lag for group in self.groups)
+
+    def _on_streams_ready(self, streams:List[dict]):
+        self.trigger('all_streams.ready', streams)
+
+    def _iterate_batches(self, max_streams:int, initial_offset:int, filter_pattern:Optional[str],
+                         stream_prefix:Optional[str]):
+        pollers = {
+            group.log_group_name: group._iterate_batches(max_streams, initial_offset, filter_pattern, stream_prefix,
+                                                         coordinated=True)
+            for group in self.groups
+        }
+        merger = WatermarkMerge()
+        poll_done = False
+
+        try:
+            while True:
+                polling = list(pollers)
+                merger.open(*polling)
+
+                while polling:
+                    for log_group_name in list(polling):
+                        batch = next(pollers[log_group_name], StopIteration)
+
+                        if batch is StopIteration:
+                            # The log group has reached the end of the time range.
+                            del pollers[log_group_name]
+                            merger.close(log_group_name)
+                            polling.remove(log_group_name)
+                        elif batch is None:
+                            merger.close(log_group_name)
+                            polling.remove(log_group_name)
+                        else:
+                            merger.push(log_group_name, batch)
+
+                        released = merger.release()
+
+                        if released:
+                            yield released
+
+                if not pollers:
+                    return
+
+                poll_done = True
+                self.finished = all(group.finished for group in self.groups)
+
+                yield None
+
+                # The groups only commit once the events merged from all of them have been dispatched.
+                self._commit()
+                poll_done = False
+
+                if self.finished:
+                    return
+        finally:
+            for poller in pollers.values():
+                poller.close()
+
+            if self.checkpoint:
+                if poll_done:
+                    self._commit()
+
+                self.checkpoint.save(force=True)
+
+    def _commit(self):
+        for group in self.groups:
+            group._commit()
+
+
+class LogStreamRegistry(object):
+    """
+    Cache of the most recently active log streams of a log group
+
+    The streams are only described again once the cache is older than ``ttl`` seconds. A refresh adds the
+    newly active streams and retires the ones without any event for ``retention`` seconds, keeping at most
+    ``limit`` streams, the most recently active first. The streams active since ``since`` (the start of the
+    tail, in milliseconds) are never retired for being idle, however long ago that is.
+    """
+    def __init__(self, logs:CloudWatchLogs, limit:int, ttl:float, retention:float, since:Optional[int]=None):
+        self.logs = logs
+        self.limit = limit
+        self.ttl = ttl
+        self.retention = retention
+        self.since = since
+        self._streams = dict()  # stream name -> stream description
+        self._refreshed_at = None
+
+    def __contains__(self, stream_name:str):
+        return stream_name in self._streams
+
+    @property
+    def streams(self) -> List[dict]:
+        return sorted(self._streams.values(), key=lambda x: x['creationTime'])
+
+    def refresh(self, force:bool=False) -> bool:
+        """
+        Refresh the cache if it has expired and tell whether the set of streams has changed.
+        """
+        now = time()
+
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.ttl:
+            return False
+
+        first_refresh = self._refreshed_at is None
+        self._refreshed_at = now
+
+        known = self._streams
+        changed = first_refresh
+
+        for stream in self.logs._iterate_log_streams(self.limit):
+            stream_name = stream['logStreamName']
+
+            if stream_name not in known:
+                changed = True
+
+            known[stream_name] = stream
+
+        cutoff = (now - self.retention) * 1000
+
+        if self.since is not None:
+            cutoff = min(cutoff, self.since)
+        stale_names = [
+            stream_name
+            for stream_name, stream in known.items()
+            if self._last_active(stream) < cutoff
+        ]
+
+        if len(known) - len(stale_names) > self.limit:
+            ranked = sorted(known.values(), key=self._last_active, reverse=True)
+            stale_names.extend(stream['logStreamName'] for stream in ranked[self.limit:])
+
+        for stream_name in set(stale_names):
+            del known[stream_name]
+            changed = True
+
+        return changed
+
+    @staticmethod
+    def _last_active(stream:dict) -> int:
+        return stream.get('lastEventTimestamp') or stream['creationTime']
 
 
-@dataclass(frozen=False, eq=False)
 class Event(object):
-    timestamp:int
-    message:str
-    stream:str
-    ingestionTime:int
-    notified:bool
+    """
+    Log event
+
+    The fields of the Lambda log line (``level``, ``request_id`` and ``body``) and ``utc_time`` are only
+    parsed when they are first accessed, then cached, no matter how many handlers read them.
+    """
+    __slots__ = ('timestamp', 'message', 'stream', 'ingestionTime', 'log_group', '_hash', '_context', '_utc_time')
+
+    def __init__(self, timestamp:int, message:str, stream:str, ingestionTime:int, log_group:Optional[str]=None):
+        self.timestamp = timestamp
+        self.message = message
+        self.stream = stream
+        self.ingestionTime = ingestionTime
+        self.log_group = log_group
+        self._hash = None
+        self._context = None
+        self._utc_time = None
+
+    def __repr__(self):
+        return (f'Event(timestamp={self.timestamp!r}, message={self.message!r}, stream={self.stream!r}, '
+                f'ingestionTime={self.ingestionTime!r}, log_group={self.log_group!r})')
+
+    def __reduce__(self):
+        # The cached hash is left out as the hashes of strings differ from one process to another.
+        return Event, (self.timestamp, self.message, self.stream, self.ingestionTime, self.log_group)
 
     def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+
         return (
             self.timestamp == other.timestamp
             and self.message == other.message
@@ -149,4 +863,47 @@ class Event(object):
         )
 
     def __hash__(self):
-        return hash((self.timestamp, self.message, self.stream, self.ingestionTime))
\ No newline at end of file
+        if self._hash is None:
+            self._hash = hash((self.timestamp, self.message, self.stream, self.ingestionTime))
+
+        return self._hash
+
+    @property
+    def is_lambda(self) -> bool:
+        return self._parse()[0] is not None
+
+    @property
+    def level(self) -> Optional[str]:
+        return self._parse()[0]
+
+    @property
+    def request_id(self) -> Optional[str]:
+        return self._parse()[1]
+
+    @property
+    def body(self) -> str:
+        """
+        The message without the prefix of the Lambda log line (or the whole message if it is not one)
+        """
+        return self._parse()[2]
+
+    @property
+    def utc_time(self) -> datetime:
+        if self._utc_time is None:
+            self._utc_time = datetime.utcfromtimestamp(self.timestamp / 1000)
+
+        return self._utc_time
+
+    def _parse(self):
+        context = self._context
+
+        if context is None:
+            message = self.message.strip()
+            matches = re_lambda_message.search(message)
+            context = self._context = (
+                (matches.group('level'), matches.group('request_id'), matches.group('message'))
+                if matches
+                else (None, None, message)
+            )
+
+        return context
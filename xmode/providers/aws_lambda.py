@@ -0,0 +1,216 @@
+from collections import OrderedDict
+import json
+from re import compile
+from typing import List, Optional
+
+from xmode.event import EventDrivenObject
+
+re_start = compile(r'^START RequestId: (?P<request_id>[A-Za-z\d\-]+)(?: Version: (?P<version>\S+))?')
+re_end = compile(r'^END RequestId: (?P<request_id>[A-Za-z\d\-]+)')
+re_report = compile(r'^REPORT RequestId: (?P<request_id>[A-Za-z\d\-]+)')
+re_report_metric = compile(r'(?P<name>[A-Za-z ]+): (?P<value>\d+(?:\.\d+)?) (?:ms|MB)')
+
+report_metrics = {
+    'Duration': 'duration',
+    'Billed Duration': 'billed_duration',
+    'Memory Size': 'memory_size',
+    'Max Memory Used': 'max_memory_used',
+    'Init Duration': 'init_duration',
+}
+
+
+def get_request_id(event) -> Optional[str]:
+    """
+    Request ID of the Lambda log line, including the START, END and REPORT lines (unlike ``Event.request_id``)
+    """
+    request_id = event.request_id
+
+    if request_id is None:
+        for pattern in (re_start, re_end, re_report):
+            matches = pattern.match(event.message)
+
+            if matches:
+                return matches.group('request_id')
+
+    return request_id
+
+
+class Invocation(object):
+    """
+    Lambda invocation, put together from its START, END and REPORT lines and its application log lines
+
+    The durations are in milliseconds and the memory sizes in MB, as reported by Lambda.
+    """
+    __slots__ = ('request_id', 'stream', 'log_group', 'version', 'started_at', 'ended_at', 'last_seen',
+                 'duration', 'billed_duration', 'memory_size', 'max_memory_used', 'init_duration',
+                 'lines', 'truncated')
+
+    def __init__(self, request_id:str, stream:str, log_group:Optional[str]):
+        self.request_id = request_id
+        self.stream = stream
+        self.log_group = log_group
+        self.version = None
+        self.started_at = None
+        self.ended_at = None
+        self.last_seen = None  # timestamp of the newest line
+        self.duration = None
+        self.billed_duration = None
+        self.memory_size = None
+        self.max_memory_used = None
+        self.init_duration = None
+        self.lines = []  # application log events
+        self.truncated = 0  # number of application log events over the limit
+
+    def __repr__(self):
+        return f'<Invocation {self.request_id} duration={self.duration}>'
+
+    @property
+    def cold_start(self) -> bool:
+        return self.init_duration is not None
+
+    def to_dict(self) -> dict:
+        return dict(request_id=self.request_id,
+                    stream=self.stream,
+                    log_group=self.log_group,
+                    version=self.version,
+                    started_at=self.started_at,
+                    ended_at=self.ended_at,
+                    duration=self.duration,
+                    billed_duration=self.billed_duration,
+                    memory_size=self.memory_size,
+                    max_memory_used=self.max_memory_used,
+                    init_duration=self.init_duration,
+                    cold_start=self.cold_start,
+                    lines=[event.body for event in self.lines],
+                    truncated=self.truncated)
+
+
+class InvocationTracker(object):
+    """
+    Index of the in-flight Lambda invocations by request ID
+
+    The START, END and REPORT lines and the application log lines are collected per invocation until its
+    REPORT line, when ``invocation.completed`` is triggered with the ``Invocation``. To bound the memory, an
+    invocation is evicted (and ``invocation.evicted`` triggered) when more than ``capacity`` are in flight
+    or when nothing was logged for it in the last ``ttl`` seconds of event time. Every invocation keeps up
+    to ``max_lines`` application log lines.
+    """
+    def __init__(self, capacity:int=10000, ttl:float=900, max_lines:int=1000):
+        self.capacity = capacity
+        self.ttl = int(ttl * 1000)
+        self.max_lines = max_lines
+        self.completed = 0
+        self.evicted = 0
+        self._invocations = OrderedDict()  # request ID -> Invocation, least recently seen first
+        self._newest_timestamp = None
+        self._target = None
+
+    def attach(self, source:EventDrivenObject, target:Optional[EventDrivenObject]=None):
+        """
+        Track the events of the source and trigger the invocation events on the target (the source by default).
+
+        Attach it before the handler workers (if any) so that the last invocations are evicted before they stop.
+        """
+        self._target = target or source
+
+        source.on('events.batch', self.add_batch)
+        source.on('done', self.close)
+
+    def add_batch(self, events:List):
+        for event in events:
+            self.add(event)
+
+        self._evict()
+
+    def add(self, event):
+        message = event.message
+        timestamp = event.timestamp
+
+        if self._newest_timestamp is None or timestamp > self._newest_timestamp:
+            self._newest_timestamp = timestamp
+
+        if message.startswith('START RequestId: '):
+            matches = re_start.match(message)
+
+            if matches:
+                invocation = self._get(matches.group('request_id'), event)
+                invocation.version = matches.group('version')
+                invocation.started_at = timestamp
+        elif message.startswith('END RequestId: '):
+            matches = re_end.match(message)
+
+            if matches:
+                self._get(matches.group('request_id'), event).ended_at = timestamp
+        elif message.startswith('REPORT RequestId: '):
+            matches = re_report.match(message)
+
+            if matches:
+                invocation = self._get(matches.group('request_id'), event)
+
+                for name, value in re_report_metric.findall(message[matches.end():]):
+                    attribute = report_metrics.get(name.strip())
+
+                    if attribute:
+                        setattr(invocation, attribute, float(value))
+
+                del self._invocations[invocation.request_id]
+                self.completed += 1
+                self._trigger('invocation.completed', invocation)
+        else:
+            request_id = event.request_id
+
+            if request_id:
+                invocation = self._get(request_id, event)
+
+                if len(invocation.lines) < self.max_lines:
+                    invocation.lines.append(event)
+                else:
+                    invocation.truncated += 1
+
+    def close(self):
+        """
+        Evict every invocation in flight.
+        """
+        while self._invocations:
+            self._evict_oldest()
+
+    def _get(self, request_id:str, event) -> Invocation:
+        invocations = self._invocations
+        invocation = invocations.get(request_id)
+
+        if invocation is None:
+            invocation = invocations[request_id] = Invocation(request_id, event.stream, event.log_group)
+        else:
+            invocations.move_to_end(request_id)
+
+        if invocation.last_seen is None or event.timestamp > invocation.last_seen:
+            invocation.last_seen = event.timestamp
+
+        return invocation
+
+    def _evict(self):
+        invocations = self._invocations
+
+        while len(invocations) > self.capacity:
+            self._evict_oldest()
+
+        if self._newest_timestamp is None:
+            return
+
+        expired_before = self._newest_timestamp - self.ttl
+
+        while invocations and next(iter(invocations.values())).last_seen < expired_before:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, invocation = self._invocations.popitem(last=False)
+        self.evicted += 1
+        self._trigger('invocation.evicted', invocation)
+
+    def _trigger(self, event_name:str, invocation:Invocation):
+        if self._target:
+            self._target.trigger(event_name, invocation)
+
+
+def invocation_to_stdout(invocation:Invocation):
+    print(json.dumps(invocation.to_dict()), flush=True)
@@ -0,0 +1,153 @@
+import json
+import mmap
+import os
+import zlib
+from typing import Iterator, List, Optional
+
+from xmode.archive import index_suffix, read_index
+from xmode.event import EventDrivenObject
+from xmode.filters import EventFilter
+from xmode.providers.aws import Event
+
+chunk_size = 1024 * 1024
+supported_suffixes = ('.jsonl', '.gz')
+
+
+class LocalLogs(EventDrivenObject):
+    """
+    Replay of the events from local JSON-lines files, plain or gzip-compressed (e.g., from ``ArchiveSink``)
+
+    The events are dispatched like ``CloudWatchLogs`` does: to the handlers of ``events.batch`` as lists,
+    then to the handlers of ``event`` one by one, then ``poll.done`` and ``done`` at the end. The files are
+    memory-mapped and parsed chunk by chunk. With a time range, the segments whose sidecar index tells they
+    are out of range are skipped without being opened. The lines rejected by the ``event_filter`` are
+    skipped before any ``Event`` is created.
+    """
+    def __init__(self, *paths:str, event_filter:Optional[EventFilter]=None):
+        super().__init__()
+
+        self.paths = paths
+        self.event_filter = event_filter
+
+    def replay(self, since:Optional[int]=None, until:Optional[int]=None, batch_size:int=1000):
+        trigger = self.trigger
+        trigger_each = self.trigger_each
+
+        try:
+            for path in self._iterate_segments(since, until):
+                for batch in self._iterate_batches(path, since, until, batch_size):
+                    trigger('events.batch', batch)
+                    trigger_each('event', batch)
+        except KeyboardInterrupt:
+            pass
+
+        self.trigger('poll.done')
+        self.trigger('done')
+
+    def _iterate_segments(self, since:Optional[int], until:Optional[int]) -> List[str]:
+        """
+        List the files to replay, in time order when they are indexed, skipping those out of the range.
+        """
+        candidates = []
+
+        for path in self.paths:
+            if os.path.isdir(path):
+                candidates.extend(
+                    os.path.join(path, name)
+                    for name in os.listdir(path)
+                    if name.endswith(supported_suffixes) and not name.endswith(index_suffix)
+                )
+            else:
+                candidates.append(path)
+
+        segments = []
+
+        for path in candidates:
+            index = read_index(path)
+
+            if index:
+                if since is not None and index['max_timestamp'] is not None and index['max_timestamp'] < since:
+                    continue
+
+                if until is not None and index['min_timestamp'] is not None and index['min_timestamp'] > until:
+                    continue
+
+            segments.append(((index or {}).get('min_timestamp') or 0, path))
+
+        return [path for _, path in sorted(segments)]
+
+    def _iterate_batches(self, path:str, since:Optional[int], until:Optional[int], batch_size:int):
+        event_filter = self.event_filter
+        batch = []
+
+        for line in _iterate_lines(path):
+            if not line.strip():
+                continue
+
+            data = json.loads(line)
+            timestamp = data['timestamp']
+
+            if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+                continue
+
+            if event_filter and not event_filter.accepts(data):
+                continue
+
+            batch.append(Event(timestamp=timestamp,
+                               message=data['message'],
+                               stream=data.get('stream') or data.get('logStreamName'),
+                               ingestionTime=data.get('ingestionTime', timestamp),
+                               log_group=data.get('log_group')))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+
+def _iterate_lines(path:str) -> Iterator[bytes]:
+    """
+    Iterate over the lines of the file, decompressing it on the fly if it is gzip-compressed.
+    """
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunks = _iterate_gzip_chunks(data) if data[:2] == b'\x1f\x8b' else _iterate_chunks(data)
+        remainder = b''
+
+        for chunk in chunks:
+            lines = (remainder + chunk).split(b'\n')
+            remainder = lines.pop()
+
+            yield from lines
+
+        if remainder:
+            yield remainder
+
+
+def _iterate_chunks(data:mmap.mmap) -> Iterator[bytes]:
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+def _iterate_gzip_chunks(data:mmap.mmap) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    offset = 0
+
+    while offset < len(data):
+        compressed = data[offset:offset + chunk_size]
+        offset += len(compressed)
+
+        yield decompressor.decompress(compressed)
+
+        while decompressor.eof and decompressor.unused_data:
+            # The file has more than one gzip member.
+            compressed = decompressor.unused_data
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+            yield decompressor.decompress(compressed)
+
+    yield decompressor.flush()
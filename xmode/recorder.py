@@ -1,10 +1,19 @@
-import logging
+from array import array
+from itertools import count
+import json
+import os
+from threading import Lock, current_thread, get_ident
 import time
 import uuid
 
-__log = logging.getLogger(__name__)
 __known_recorders = {}
 
+_INSTANT = 0
+_BEGIN = 1
+_END = 2
+_chrome_phases = {_INSTANT: 'i', _BEGIN: 'B', _END: 'E'}
+
+
 def get(name):
     global __known_recorders
 
@@ -17,52 +26,114 @@ def get(name):
 
 
 class Recorder:
+    """
+    Low-overhead profiler recording named events and spans with a nanosecond clock
+
+    The records go into arrays preallocated for ``capacity`` records. Once they are full, the newer records
+    are dropped (see ``dropped``). Recording is safe from many threads and nothing is logged on the way.
+    Export the records once the recording is over (e.g., after ``stop``). The records are exported in
+    chronological order, which may differ from the order of their indexes across threads.
+    """
     __instance__ = None
 
-    def __init__(self):
+    def __init__(self, capacity:int=65536):
         self.__id = str(uuid.uuid4())
-        self.__starting_time = None
-        self.__last_update = None
-        self.__next_index = 0
-        self.__raw_records = []
-        self.__stopped = False
+        self.capacity = capacity
+        self.__timestamps = None  # perf_counter_ns, 0 for the free slots (see reset)
+        self.__names = _zeros('l', capacity)  # index in __name_list
+        self.__kinds = _zeros('b', capacity)
+        self.__threads = _zeros('Q', capacity)  # thread identifiers
+        self.__name_list = []
+        self.__name_ids = {}
+        self.__thread_names = {}
+        self.__lock = Lock()
+        self.reset()
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of records dropped because the recorder was full
+        """
+        return self.__dropped
 
     def stop(self):
         self.record('profiler.stopped')
         self.__stopped = True
 
     def reset(self):
-        self.__starting_time = None
-        self.__last_update = None
-        self.__next_index = 0
-        self.__raw_records = []
+        self.__starting_time = None  # wall-clock time, in seconds
+        self.__starting_ns = None  # perf_counter_ns
+        self.__timestamps = _zeros('q', self.capacity)  # Only the slots with a timestamp are exported.
+        self.__sequence = count()
+        self.__dropped = 0
         self.__stopped = False
 
-    def record(self, event_name: str):
-        if self.__stopped:
-            return
+    def record(self, event_name:str):
+        self.__append(event_name, _INSTANT)
 
-        if not self.__starting_time:
-            self.__starting_time = time.time()
-            self.record('profiler.started')
+    def span(self, name:str) -> 'Span':
+        """
+        Context manager recording the beginning and the end of a (possibly nested) span of time.
+        """
+        return Span(self, name)
 
-        occurred_time = time.time()
-        elapsed_time = occurred_time - self.__last_update if self.__last_update else 0
+    def begin(self, name:str):
+        self.__append(name, _BEGIN)
 
-        __log.info(f'Profiler: {self.__id}: {event_name}: BE={elapsed_time:.3f}s (TE={time.time() - self.__starting_time:.3f}s)')
-
-        self.__raw_records.append((self.__next_index, event_name, elapsed_time))
-
-        self.__last_update = occurred_time
-        self.__next_index += 1
+    def end(self, name:str):
+        self.__append(name, _END)
 
     def export(self):
+        """
+        Export the records as a dictionary: ``st`` is the starting (wall-clock) time, ``et`` the elapsed
+        time from the start to the last record, and ``s`` the records, with their index (``i``), name
+        (``e``), time since the previous record (``t``), kind (``k``: ``i`` for events, ``B`` and ``E``
+        for the beginning and the end of spans) and thread (``th``), the times being in seconds.
+        """
         event_sequence = []
-
-        for index, event_name, elapsed_time in self.__raw_records:
-            event_sequence.append(dict(i=index, e=event_name, t=elapsed_time))
-
-        return dict(et=self.__raw_records[-1][0] - self.__starting_time, st=self.__starting_time, s=event_sequence)
+        previous = self.__starting_ns
+
+        for index, timestamp, name, kind, thread in self.__iterate_records():
+            event_sequence.append(dict(i=index,
+                                       e=name,
+                                       t=(timestamp - previous) / 1e9,
+                                       k=_chrome_phases[kind],
+                                       th=self.__thread_names.get(thread, thread)))
+            previous = timestamp
+
+        elapsed_time = (previous - self.__starting_ns) / 1e9 if event_sequence else 0
+
+        return dict(et=elapsed_time, st=self.__starting_time, s=event_sequence)
+
+    def export_chrome_trace(self) -> dict:
+        """
+        Export the records in the Chrome trace event format (for chrome://tracing or Perfetto).
+        """
+        pid = os.getpid()
+        trace_events = [
+            dict(name='thread_name', ph='M', pid=pid, tid=thread, args=dict(name=thread_name))
+            for thread, thread_name in self.__thread_names.items()
+        ]
+
+        for _, timestamp, name, kind, thread in self.__iterate_records():
+            trace_event = dict(name=name,
+                               ph=_chrome_phases[kind],
+                               ts=(timestamp - self.__starting_ns) / 1000,
+                               pid=pid,
+                               tid=thread)
+
+            if kind == _INSTANT:
+                trace_event['s'] = 't'
+
+            trace_events.append(trace_event)
+
+        return dict(traceEvents=trace_events,
+                    displayTimeUnit='ms',
+                    otherData=dict(recorder=self.__id, started_at=self.__starting_time, dropped=self.dropped))
+
+    def write_chrome_trace(self, path:str):
+        with open(path, 'w') as f:
+            json.dump(self.export_chrome_trace(), f)
 
     @classmethod
     def instance(cls):
@@ -72,3 +143,92 @@ class Recorder:
         cls.__instance__ = cls()
 
         return cls.__instance__
+
+    def __append(self, name:str, kind:int, timestamp:int=None):
+        if self.__stopped:
+            return
+
+        if timestamp is None:
+            if self.__starting_ns is None:
+                self.__start()
+
+            timestamp = time.perf_counter_ns()  # after the start, even if it happened on another thread
+
+        index = next(self.__sequence)
+
+        if index >= self.capacity:
+            with self.__lock:
+                self.__dropped += 1
+
+            return
+
+        name_id = self.__name_ids.get(name)
+
+        if name_id is None:
+            name_id = self.__intern(name)
+
+        thread = get_ident()
+
+        if thread not in self.__thread_names:
+            self.__thread_names[thread] = current_thread().name
+
+        self.__timestamps[index] = timestamp
+        self.__names[index] = name_id
+        self.__kinds[index] = kind
+        self.__threads[index] = thread
+
+    def __start(self):
+        with self.__lock:
+            if self.__starting_ns is not None:
+                return
+
+            timestamp = time.perf_counter_ns()
+            self.__starting_time = time.time()
+            self.__starting_ns = timestamp
+
+        self.__append('profiler.started', _INSTANT, timestamp)
+
+    def __intern(self, name:str) -> int:
+        with self.__lock:
+            name_id = self.__name_ids.get(name)
+
+            if name_id is None:
+                name_id = self.__name_ids[name] = len(self.__name_list)
+                self.__name_list.append(name)
+
+            return name_id
+
+    def __iterate_records(self):
+        name_list = self.__name_list
+        timestamps = self.__timestamps
+        # The written slots are found by their timestamps, so that the records need no count of their own
+        # and the indexes issued but not written yet are left out.
+        indexes = sorted((index for index, timestamp in enumerate(timestamps) if timestamp),
+                         key=timestamps.__getitem__)
+
+        for index in indexes:
+            yield (index,
+                   timestamps[index],
+                   name_list[self.__names[index]],
+                   self.__kinds[index],
+                   self.__threads[index])
+
+
+class Span:
+    __slots__ = ('recorder', 'name')
+
+    def __init__(self, recorder:Recorder, name:str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.recorder.begin(self.name)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.end(self.name)
+
+
+def _zeros(typecode:str, length:int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * length))
@@ -0,0 +1,199 @@
+from functools import partial
+from logging import getLogger
+import multiprocessing
+from queue import Empty, Full
+from traceback import format_exc
+from typing import Dict, List
+
+from xmode.event import EventDrivenObject
+from xmode.providers.aws_lambda import get_request_id
+from xmode.utils.importer import import_callable
+
+_logger = getLogger(__name__)
+
+
+class ShardedProcessDispatcher(EventDrivenObject):
+    """
+    Event bus which shards the events across worker processes
+
+    The events with the same key (e.g., the same stream or the same Lambda request ID) always go to the same
+    worker, in order. Every worker imports the handlers registered with ``register`` by itself and so has
+    its own instance of their state. When the source is done, the workers trigger ``shard.done``, whose
+    handlers return the state of the worker, and the states of all workers are passed as a list to the
+    handlers of ``shard.merge`` on this bus, right before ``done``.
+
+    A worker which fails or dies is reported when the bus is closed and its state is left out of the merge.
+    """
+    worker_events = ('event', 'events.batch', 'shard.done')
+    shard_keys = ('stream', 'request_id', 'log_group')
+    check_interval = 1.0  # seconds between the checks that the workers are still alive while waiting for them
+
+    def __init__(self, processes:int, shard_by:str='stream', capacity:int=100):
+        super().__init__()
+
+        if shard_by not in self.shard_keys:
+            raise ValueError(f'Unknown shard key: {shard_by} (expected one of {", ".join(self.shard_keys)})')
+
+        self.processes = max(1, processes)
+        self.shard_by = shard_by
+        self.capacity = capacity  # batches waiting per worker
+        self._handler_paths = dict()  # event name -> handler paths, for the workers
+        self._inboxes = []
+        self._outbox = None
+        self._workers = []
+
+    def register(self, event_name:str, handler_path:str):
+        """
+        Register the handler, by its fully qualified path, on the workers (for the worker events) or on
+        this bus (for the other events). The handler is imported right away either way so that an invalid
+        path fails here rather than in the workers.
+        """
+        handler = import_callable(handler_path)
+
+        if event_name in self.worker_events:
+            self._handler_paths.setdefault(event_name, []).append(handler_path)
+        else:
+            self.on(event_name, handler)
+
+    def attach(self, source:EventDrivenObject):
+        for event_name in list(self._events):
+            if event_name not in ('done', 'shard.merge'):
+                source.on(event_name, partial(self.trigger, event_name))
+
+        source.on('events.batch', self.submit_batch)
+        source.on('done', self.close)
+
+        self.start()
+
+    def start(self):
+        if self._workers:
+            return
+
+        self._outbox = multiprocessing.Queue()
+
+        for index in range(self.processes):
+            inbox = multiprocessing.Queue(self.capacity)
+            worker = multiprocessing.Process(target=_run_shard,
+                                             args=(index, self._handler_paths, inbox, self._outbox),
+                                             name=f'xmode-shard-{index}',
+                                             daemon=True)
+            worker.start()
+
+            self._inboxes.append(inbox)
+            self._workers.append(worker)
+
+    def submit_batch(self, events:List):
+        shard_count = self.processes
+        shard_by = self.shard_by
+        shards = [[] for _ in range(shard_count)]
+
+        for event in events:
+            key = (get_request_id(event) if shard_by == 'request_id' else getattr(event, shard_by)) or event.stream
+            shards[hash(key) % shard_count].append(event)
+
+        for index, shard in enumerate(shards):
+            if shard:
+                self._put(index, shard)
+
+    def close(self):
+        """
+        Let the workers handle every event, collect their states, then trigger ``shard.merge`` and ``done``.
+        """
+        workers = self._workers
+
+        for index in range(len(workers)):
+            try:
+                self._put(index, None)
+            except RuntimeError:
+                pass  # Reported below, with the other workers which have not posted their states.
+
+        states = [[] for _ in workers]
+        pending = set(range(len(workers)))
+        stopped = set()  # the workers found dead, given one more interval to post their states
+
+        while pending:
+            try:
+                index, worker_states, error = self._outbox.get(timeout=self.check_interval)
+            except Empty:
+                for index in stopped & pending:
+                    _logger.error(f'{workers[index].name} has died (exit code {workers[index].exitcode})')
+
+                pending -= stopped
+                stopped = {index for index in pending if not workers[index].is_alive()}
+
+                continue
+
+            pending.discard(index)
+
+            if error:
+                _logger.error(f'{workers[index].name} has failed:\n{error}')
+            else:
+                states[index] = worker_states
+
+        for worker in workers:
+            worker.join(self.check_interval)
+
+            if worker.is_alive():
+                worker.terminate()
+
+        self._inboxes = []
+        self._workers = []
+
+        self.trigger('shard.merge', [state for worker_states in states for state in worker_states])
+        self.trigger('done')
+
+    def _put(self, index:int, item):
+        """
+        Put the item into the inbox of the worker, waiting for room as long as the worker is alive.
+        """
+        inbox = self._inboxes[index]
+        worker = self._workers[index]
+
+        while True:
+            try:
+                inbox.put(item, timeout=self.check_interval)
+
+                return
+            except Full:
+                if not worker.is_alive():
+                    raise RuntimeError(f'{worker.name} has died (exit code {worker.exitcode})')
+
+
+class _Shard(EventDrivenObject):
+    def __init__(self, handler_paths:Dict[str, List[str]]):
+        super().__init__()
+
+        for event_name, paths in handler_paths.items():
+            for path in paths:
+                self.on(event_name, import_callable(path))
+
+    def handle(self, events:List):
+        try:
+            self.trigger('events.batch', events)
+            self.trigger_each('event', events)
+        except Exception:
+            _logger.exception('Failed to handle the events')
+
+    def collect(self, event_name:str) -> list:
+        return [callback() for callback in self._events.get(event_name, ())]
+
+
+def _run_shard(index:int, handler_paths:Dict[str, List[str]], inbox, outbox):
+    """
+    Handle the events of the shard until the inbox is closed, then post ``(index, states, error)``, with the
+    traceback as the error if the worker has failed.
+    """
+    try:
+        shard = _Shard(handler_paths)
+
+        while True:
+            events = inbox.get()
+
+            if events is None:
+                break
+
+            shard.handle(events)
+
+        outbox.put((index, shard.collect('shard.done'), None))
+    except BaseException:
+        outbox.put((index, None, format_exc()))
@@ -0,0 +1,115 @@
+import json
+import sys
+from time import gmtime, strftime, time
+from typing import List, Optional, TextIO
+
+from xmode.event import EventDrivenObject
+
+
+class BufferedSink(object):
+    """
+    Output of the tailed events through a write buffer
+
+    The buffer is flushed once it holds ``buffer_size`` characters, at the end of a poll if the last flush
+    is older than ``flush_interval`` seconds, and when the tail is done.
+    """
+    def __init__(self, stream:Optional[TextIO]=None, buffer_size:int=65536, flush_interval:float=1.0):
+        self.stream = stream or sys.stdout
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._buffered_size = 0
+        self._flushed_at = time()
+
+    def attach(self, source:EventDrivenObject):
+        source.on('events.batch', self.write_batch)
+        source.on('poll.done', self.flush_if_due)
+        source.on('done', self.close)
+
+    def format(self, event) -> str:
+        raise NotImplementedError()
+
+    def write(self, event):
+        line = self.format(event)
+
+        self._buffer.append(line)
+        self._buffered_size += len(line)
+
+        if self._buffered_size >= self.buffer_size:
+            self.flush()
+
+    def write_batch(self, events:List):
+        format_event = self.format
+        lines = [format_event(event) for event in events]
+
+        self._buffer.extend(lines)
+        self._buffered_size += sum(map(len, lines))
+
+        if self._buffered_size >= self.buffer_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        if time() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered_size = 0
+
+        self.stream.flush()
+        self._flushed_at = time()
+
+    def close(self):
+        self.flush()
+
+
+class TextSink(BufferedSink):
+    """
+    Sink writing one line of text per event, in the same format as ``event_to_stdout``
+    """
+    def __init__(self, stream:Optional[TextIO]=None, buffer_size:int=65536, flush_interval:float=1.0):
+        super().__init__(stream, buffer_size, flush_interval)
+
+        self._second = None
+        self._formatted_second = None
+
+    def format(self, event) -> str:
+        second = event.timestamp // 1000
+
+        if second != self._second:
+            # The events come in timestamp order, so the same second is usually formatted many times in a row.
+            self._second = second
+            self._formatted_second = strftime('%Y.%m.%d %H:%M:%S', gmtime(second))
+
+        if event.is_lambda:
+            return f'{self._formatted_second}: [LAMBDA] {event.level}: {event.request_id}: {event.body}\n'
+
+        return f'{self._formatted_second}: [?] {event.body}\n'
+
+
+class JsonLinesSink(BufferedSink):
+    """
+    Sink writing one JSON object per line and per event
+    """
+    def __init__(self, stream:Optional[TextIO]=None, buffer_size:int=65536, flush_interval:float=1.0):
+        super().__init__(stream, buffer_size, flush_interval)
+
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def format(self, event) -> str:
+        return self._encode(to_dict(event)) + '\n'
+
+
+def to_dict(event) -> dict:
+    return dict(timestamp=event.timestamp,
+                ingestionTime=event.ingestionTime,
+                stream=event.stream,
+                log_group=event.log_group,
+                message=event.message)
+
+
+sink_classes = dict(text=TextSink, jsonl=JsonLinesSink)
@@ -0,0 +1,43 @@
+from random import uniform
+from threading import Lock
+from time import sleep, time
+
+
+class SharedBackoff(object):
+    """
+    Jittered exponential back-off shared by concurrent workers
+
+    When one worker reports a throttle, every worker waits until the same resume time before making
+    its next call. The delay doubles with each consecutive throttle, up to the ceiling, and resets
+    after a successful call.
+    """
+    def __init__(self, base:float=0.25, ceiling:float=20.0):
+        self.base = base
+        self.ceiling = ceiling
+        self._attempts = 0
+        self._resume_at = 0.0
+        self._lock = Lock()
+
+    @property
+    def attempts(self):
+        return self._attempts
+
+    def wait(self):
+        delay = self._resume_at - time()
+
+        while delay > 0:
+            sleep(delay)
+            delay = self._resume_at - time()  # Another worker may have been throttled in the meantime.
+
+    def throttled(self):
+        with self._lock:
+            self._attempts += 1
+            cap = min(self.ceiling, self.base * 2 ** self._attempts)
+            self._resume_at = max(self._resume_at, time() + cap / 2 + uniform(0, cap / 2))
+
+    def succeeded(self):
+        if not self._attempts:
+            return
+
+        with self._lock:
+            self._attempts = 0
@@ -0,0 +1,11 @@
+from importlib import import_module
+from typing import Callable
+
+
+def import_callable(path:str) -> Callable:
+    """
+    Import the callable from its fully qualified path (e.g., samples.logs.aggregate).
+    """
+    blocks = path.split('.')
+
+    return getattr(import_module('.'.join(blocks[:-1])), blocks[-1])
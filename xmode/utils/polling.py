@@ -0,0 +1,70 @@
+from time import time
+from typing import Optional
+
+
+class PollScheduler(object):
+    """
+    Pause between the polls of a tail, adapting to the activity of the log group(s)
+
+    The scheduler is given the running totals of the tail at the end of every poll and works on their
+    increase over the poll. The events are counted as fetched, before any filtering or de-duplication, as
+    the pause has to follow the activity of the log group(s), not what the handlers get to see.
+
+    While the polls bring events, the pause follows the ingestion lag (``ingestionTime - timestamp``,
+    smoothed over the polls), since polling much faster than the events are ingested only adds empty calls,
+    and drops to ``minimum`` when a poll brings ``busy_events`` or more (i.e., the tail is catching up).
+    Each poll without any event doubles the pause, up to ``maximum``. With an ``api_budget`` (API calls per
+    second), the pause is also long enough for the calls of the last poll to fit into the budget.
+    """
+    lag_factor = 0.5  # pause as a fraction of the smoothed ingestion lag while the events keep coming
+    busy_events = 1000  # events in a poll above which the next poll starts right away
+    smoothing = 0.3  # weight of the last poll in the moving averages
+
+    def __init__(self, minimum:float=0.5, maximum:float=30.0, api_budget:Optional[float]=None):
+        if not 0 < minimum <= maximum:
+            raise ValueError(f'Invalid poll interval: {minimum}s to {maximum}s (expected 0 < minimum <= maximum)')
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.api_budget = api_budget
+        self.interval = minimum  # the last pause, in seconds
+        self.lag = None  # moving average of the ingestion lag, in seconds
+        self.rate = 0.0  # moving average of the events per poll
+        self._events_fetched = 0
+        self._ingestion_lag = 0
+        self._api_calls = 0
+        self._resumed_at = time()
+
+    def next_interval(self, api_calls:int=0, events_fetched:int=0, ingestion_lag:int=0) -> float:
+        """
+        Close the current poll and tell how long to wait before the next one.
+
+        ``api_calls`` is the total number of API calls made by the tail so far, ``events_fetched`` the total
+        number of events fetched and ``ingestion_lag`` their total ingestion lag, in milliseconds.
+        """
+        smoothing = self.smoothing
+        count = events_fetched - self._events_fetched
+        self.rate += smoothing * (count - self.rate)
+
+        if not count:
+            interval = min(self.maximum, max(self.interval, self.minimum) * 2)
+        elif count >= self.busy_events:
+            interval = self.minimum
+        else:
+            lag = (ingestion_lag - self._ingestion_lag) / count / 1000
+            self.lag = lag if self.lag is None else self.lag + smoothing * (lag - self.lag)
+            interval = min(self.maximum, max(self.minimum, self.lag * self.lag_factor))
+
+        now = time()
+
+        if self.api_budget:
+            # The calls of the last poll, spread over the poll and the pause, must not exceed the budget.
+            interval = max(interval, (api_calls - self._api_calls) / self.api_budget - (now - self._resumed_at))
+
+        self.interval = interval
+        self._events_fetched = events_fetched
+        self._ingestion_lag = ingestion_lag
+        self._api_calls = api_calls
+        self._resumed_at = now + interval
+
+        return interval
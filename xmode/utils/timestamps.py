@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from re import compile
+from time import time
+from typing import Optional
+
+re_relative_time = compile(r'^(?P<amount>\d+(\.\d+)?)(?P<unit>ms|s|m|h|d)$')
+_unit_to_ms = dict(ms=1, s=1000, m=60000, h=3600000, d=86400000)
+
+
+def parse_timestamp(value:str, now:Optional[float]=None) -> int:
+    """
+    Parse the time into a timestamp in milliseconds.
+
+    The time can be a timestamp in milliseconds (e.g., ``1600000000000``), a duration before now
+    (e.g., ``90s``, ``15m``, ``2h`` or ``1d``) or an ISO 8601 date and time, in UTC unless specified
+    (e.g., ``2020-09-13T12:26:40``).
+    """
+    value = value.strip()
+
+    if value.isdigit():
+        return int(value)
+
+    matches = re_relative_time.search(value)
+
+    if matches:
+        now = time() if now is None else now
+        return int(now * 1000 - float(matches.group('amount')) * _unit_to_ms[matches.group('unit')])
+
+    parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return int(parsed.timestamp() * 1000)
@@ -0,0 +1,174 @@
+from collections import Counter
+import json
+from typing import Callable, Dict, List, Optional
+
+from xmode.aggregation import SeriesSummary
+from xmode.event import EventDrivenObject
+
+
+class LevelCounts(object):
+    """
+    Number of events per Lambda log level (``NONE`` for the other events)
+    """
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, event):
+        self.counts[event.level or 'NONE'] += 1
+
+    def result(self) -> dict:
+        return dict(self.counts)
+
+
+class IngestionLatency(object):
+    """
+    Summary of the time (in milliseconds) between the timestamp of the events and their ingestion
+    """
+    def __init__(self):
+        self.summary = SeriesSummary()
+
+    def add(self, event):
+        self.summary.add(event.ingestionTime - event.timestamp)
+
+    def result(self) -> dict:
+        return self.summary.to_dict()
+
+
+accumulator_classes = dict(levels=LevelCounts, latency=IngestionLatency)
+
+
+class Window(object):
+    __slots__ = ('start', 'end', 'count', 'accumulators')
+
+    def __init__(self, start:int, end:int, accumulators:Dict[str, object]):
+        self.start = start
+        self.end = end
+        self.count = 0
+        self.accumulators = accumulators
+
+    def __repr__(self):
+        return f'<Window {self.start}-{self.end} count={self.count}>'
+
+    @property
+    def rate(self) -> float:
+        """
+        Number of events per second
+        """
+        return self.count * 1000 / (self.end - self.start)
+
+    def add(self, event):
+        self.count += 1
+
+        for accumulator in self.accumulators.values():
+            accumulator.add(event)
+
+    def to_dict(self) -> dict:
+        return dict(start=self.start,
+                    end=self.end,
+                    count=self.count,
+                    rate=self.rate,
+                    **{name: accumulator.result() for name, accumulator in self.accumulators.items()})
+
+
+class WindowedAggregator(object):
+    """
+    Aggregation of the events in time windows, by their timestamps
+
+    The windows are ``size`` seconds long and start every ``slide`` seconds: tumbling windows by default, or
+    sliding (overlapping) windows when ``slide`` is shorter than ``size``. Every window runs its own instance
+    of the ``accumulators`` (name -> class with ``add(event)`` and ``result()``).
+
+    A window is closed, and ``window.closed`` triggered with it, once the newest timestamp seen is more than
+    ``allowed_lateness`` seconds past its end. The events arriving after their windows are closed are not
+    aggregated and only counted in ``late``. The windows still open when the source is done are closed then.
+    """
+    def __init__(self, size:float, slide:Optional[float]=None, allowed_lateness:float=0,
+                 accumulators:Optional[Dict[str, Callable]]=None):
+        self.size = int(size * 1000)
+        self.slide = int((slide or size) * 1000)
+
+        if self.size <= 0 or not 0 < self.slide <= self.size:
+            raise ValueError(f'Invalid window: {size}s sliding every {slide}s (expected 0 < slide <= size)')
+
+        self.allowed_lateness = int(allowed_lateness * 1000)
+        self.accumulators = accumulators if accumulators is not None else dict(levels=LevelCounts)
+        self.late = 0  # number of events which missed a closed window
+        self.watermark = None  # windows ending at or before it are closed
+        self._newest_timestamp = None
+        self._windows = dict()  # type: Dict[int, Window]
+        self._target = None
+
+    def attach(self, source:EventDrivenObject, target:Optional[EventDrivenObject]=None):
+        """
+        Aggregate the events of the source and trigger ``window.closed`` on the target (the source by default).
+
+        Attach it before the handler workers (if any) so that the last windows are closed before they are.
+        """
+        self._target = target or source
+
+        source.on('events.batch', self.add_batch)
+        source.on('done', self.close)
+
+    def add_batch(self, events:List):
+        for event in events:
+            self.add(event)
+
+        self._advance()
+
+    def add(self, event):
+        timestamp = event.timestamp
+        watermark = self.watermark
+        windows = self._windows
+        missed = False
+        start = timestamp - timestamp % self.slide
+
+        while start > timestamp - self.size:
+            end = start + self.size
+
+            if watermark is not None and end <= watermark:
+                missed = True
+            else:
+                window = windows.get(start)
+
+                if window is None:
+                    window = windows[start] = Window(start, end, {name: accumulator_class()
+                                                                  for name, accumulator_class in self.accumulators.items()})
+
+                window.add(event)
+
+            start -= self.slide
+
+        if missed:
+            self.late += 1
+
+        if self._newest_timestamp is None or timestamp > self._newest_timestamp:
+            self._newest_timestamp = timestamp
+
+    def close(self):
+        """
+        Close every open window.
+        """
+        self._emit(sorted(self._windows))
+
+    def _advance(self):
+        if self._newest_timestamp is None:
+            return
+
+        watermark = self._newest_timestamp - self.allowed_lateness
+
+        if self.watermark is not None and watermark <= self.watermark:
+            return
+
+        self.watermark = watermark
+        self._emit(sorted(start for start, window in self._windows.items() if window.end <= watermark))
+
+    def _emit(self, starts:List[int]):
+        for start in starts:
+            window = self._windows.pop(start)
+
+            if self._target:
+                self._target.trigger('window.closed', window)
+
+
+def window_to_stdout(window:Window):
+    print(json.dumps(window.to_dict()), flush=True)